@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of the tweet formatting path.
+
+Compares the old per-message formatting (pytz.timezone lookup, utcnow and
+a fresh profile button for every tweet) with TweetFormatter's cached
+per-account templates over a burst of tweets.
+
+Usage: python benchmarks/bench_format.py [tweets] [repeats]
+"""
+import os
+import sys
+import datetime
+import timeit
+import pytz
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from apis.formatter import TweetFormatter  # noqa: E402
+from apis.records import Tweet  # noqa: E402
+
+
+def legacy_format(username: str, tweet: dict):
+    """The formatting path before TweetFormatter, kept here for comparison"""
+    text = tweet['text'] if len(tweet['text']) <= 200 else tweet['text'][:197] + "..."
+    tweet_link = f"https://twitter.com/{username}/status/{tweet['id']}"
+    utc_time = pytz.utc.localize(datetime.datetime.utcnow())
+    timestamp = utc_time.astimezone(pytz.timezone('America/New_York')).strftime("%I:%M %p")
+    label = "💬 View Reply" if tweet['is_reply'] else "🔗 View Tweet"
+    kind = "Reply" if tweet['is_reply'] else "Tweet"
+    keyboard = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(label, url=tweet_link),
+            InlineKeyboardButton("👤 View Profile", url=f"https://twitter.com/{username}")
+        ]
+    ])
+    message = f"<b>{kind} | @{username}</b>\n\n{text}\n\n🕒 {timestamp}"
+    return message, keyboard
+
+
+def make_tweets(count: int) -> list[dict]:
+    start = datetime.datetime(2024, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            'id': str(1785000000000000000 + index),
+            'text': f"Burst tweet number {index} " + "lorem ipsum " * 25,
+            'created_at': (start + datetime.timedelta(seconds=index)).isoformat().replace('+00:00', 'Z'),
+            'is_reply': index % 3 == 0
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tweets = make_tweets(count)
+    records = [Tweet(int(tweet['id']), tweet['text'], tweet['created_at'], tweet['is_reply']) for tweet in tweets]
+    formatter = TweetFormatter()
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_format("benchmark", tweet) for tweet in tweets],
+        number=1, repeat=repeats
+    ))
+    batched = min(timeit.repeat(
+        lambda: formatter.format_batch("benchmark", records),
+        number=1, repeat=repeats
+    ))
+
+    print(f"{count} tweets, best of {repeats}")
+    print(f"legacy per-message: {legacy * 1e6 / count:8.2f} us/tweet")
+    print(f"TweetFormatter:     {batched * 1e6 / count:8.2f} us/tweet")
+    print(f"speedup:            {legacy / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
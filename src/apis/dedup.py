@@ -0,0 +1,67 @@
+import logging
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class DedupIndex:
+    """
+    Bounded LRU of recently delivered tweet IDs.
+    Claimed IDs are written behind to the delivered_tweets table so a
+    restart, another shard or another ingestion path does not resend them.
+    """
+
+    def __init__(self, account_queries, capacity: int = 10000):
+        self.account_queries = account_queries
+        self.capacity = capacity
+        self.ids = OrderedDict()
+        self.pending = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, tweet_id: int) -> bool:
+        return tweet_id in self.ids
+
+    def add(self, tweet_id: int):
+        self.ids[tweet_id] = None
+        self.ids.move_to_end(tweet_id)
+        while len(self.ids) > self.capacity:
+            self.ids.popitem(last=False)
+
+    def claim(self, tweets: list) -> list:
+        """Return the tweets not delivered before and mark them delivered"""
+        fresh = []
+        for tweet in tweets:
+            if tweet.id in self.ids:
+                metrics.DUPLICATE_TWEETS.inc()
+                continue
+            self.add(tweet.id)
+            self.pending.append(tweet.id)
+            fresh.append(tweet)
+        return fresh
+
+    async def load(self):
+        """Seed the index with the most recent deliveries stored in the database"""
+        try:
+            tweet_ids = await self.account_queries.get_recent_deliveries(self.capacity)
+        except Exception as e:
+            logger.error(f"Error loading delivered tweets: {e}")
+            return
+        # Oldest first so the newest end up most recently used
+        for tweet_id in reversed(tweet_ids):
+            self.add(int(tweet_id))
+        logger.info(f"Loaded {len(tweet_ids)} delivered tweet IDs")
+
+    async def flush(self):
+        """Write claimed IDs to the database and trim it to the index capacity"""
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, []
+        try:
+            await self.account_queries.save_deliveries(pending)
+            await self.account_queries.prune_deliveries(self.capacity)
+        except Exception as e:
+            # The in-memory index still holds them, only a restart could resend
+            logger.error(f"Error saving {len(pending)} delivered tweet IDs: {e}")
@@ -0,0 +1,98 @@
+import datetime
+import logging
+import pytz
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from apis.records import Tweet
+
+logger = logging.getLogger(__name__)
+
+# Resolved once, pytz.timezone() does a lookup and allocation on every call
+NEW_YORK = pytz.timezone('America/New_York')
+
+
+class AccountTemplate:
+    """Message pieces that only depend on the account, built once per username"""
+
+    __slots__ = ('username', 'profile_url', 'tweet_url_prefix', 'profile_button',
+                 'profile_keyboard', 'tweet_header', 'reply_header', 'digest_header')
+
+    def __init__(self, username: str):
+        self.username = username
+        self.profile_url = f"https://twitter.com/{username}"
+        self.tweet_url_prefix = f"{self.profile_url}/status/"
+        self.profile_button = InlineKeyboardButton("👤 View Profile", url=self.profile_url)
+        self.profile_keyboard = InlineKeyboardMarkup([[self.profile_button]])
+        self.tweet_header = f"<b>Tweet | @{username}</b>\n\n"
+        self.reply_header = f"<b>Reply | @{username}</b>\n\n"
+        self.digest_header = f" new posts | @{username}</b>\n\n"
+
+
+class TweetFormatter:
+    """
+    Builds Telegram messages for tweets.
+    Per-account headers, URLs and the profile button are cached, and the
+    timestamp comes from the tweet's own created_at.
+    """
+
+    def __init__(self, max_text_length: int = 200):
+        self.max_text_length = max_text_length
+        self.templates = {}
+
+    def template(self, username: str) -> AccountTemplate:
+        template = self.templates.get(username)
+        if template is None:
+            template = self.templates[username] = AccountTemplate(username)
+        return template
+
+    def forget(self, username: str):
+        """Drop the cached template of an account that is no longer monitored"""
+        self.templates.pop(username, None)
+
+    def shorten_text(self, text: str) -> str:
+        if len(text) > self.max_text_length:
+            return text[:self.max_text_length - 3] + "..."
+        return text
+
+    @staticmethod
+    def timestamp(created_at: str = None) -> str:
+        """New York wall-clock time of a tweet, now when created_at is missing"""
+        if created_at:
+            try:
+                moment = datetime.datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            except ValueError:
+                moment = datetime.datetime.now(datetime.timezone.utc)
+        else:
+            moment = datetime.datetime.now(datetime.timezone.utc)
+        return moment.astimezone(NEW_YORK).strftime("%I:%M %p")
+
+    def tweet_url(self, username: str, tweet_id) -> str:
+        return f"{self.template(username).tweet_url_prefix}{tweet_id}"
+
+    def format_text(self, template: AccountTemplate, tweet: Tweet) -> str:
+        """Message body without buttons"""
+        header = template.reply_header if tweet.is_reply else template.tweet_header
+        return f"{header}{self.shorten_text(tweet.text)}\n\n🕒 {self.timestamp(tweet.created_at)}"
+
+    def format(self, username: str, tweet: Tweet) -> tuple[str, InlineKeyboardMarkup]:
+        """Format one tweet or reply with its view and profile buttons"""
+        template = self.template(username)
+        label = "💬 View Reply" if tweet.is_reply else "🔗 View Tweet"
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton(label, url=f"{template.tweet_url_prefix}{tweet.id}"),
+            template.profile_button
+        ]])
+        return self.format_text(template, tweet), keyboard
+
+    def format_batch(self, username: str, tweets: list) -> list[tuple[str, InlineKeyboardMarkup]]:
+        """Format all of an account's tweets from one cycle, in the given order"""
+        return [self.format(username, tweet) for tweet in tweets]
+
+    def format_digest_entry(self, username: str, tweet: Tweet) -> str:
+        """One tweet inside a digest, linked inline instead of with a button"""
+        template = self.template(username)
+        label = "💬 View Reply" if tweet.is_reply else "🔗 View Tweet"
+        link = f"{template.tweet_url_prefix}{tweet.id}"
+        return f'{self.format_text(template, tweet)}\n<a href="{link}">{label}</a>'
+
+    def digest_header(self, username: str, count: int) -> str:
+        return f"<b>🧵 {count}{self.template(username).digest_header}"
@@ -0,0 +1,64 @@
+import json
+import logging
+import datetime
+from dataclasses import dataclass
+from operator import attrgetter
+
+try:
+    import orjson
+    FAST_JSON_AVAILABLE = True
+except ImportError:
+    FAST_JSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def loads(content: bytes | str):
+    """Decode a JSON payload, with orjson when it is installed"""
+    if FAST_JSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Twitter snowflake IDs carry their creation time in milliseconds since this epoch
+SNOWFLAKE_EPOCH_MS = 1288834974657
+
+
+def snowflake_at(moment: datetime.datetime) -> int:
+    """Smallest snowflake ID that could have been created at the given time"""
+    return (int(moment.timestamp() * 1000) - SNOWFLAKE_EPOCH_MS) << 22
+
+
+@dataclass(slots=True)
+class Tweet:
+    """A tweet reduced to what monitoring and formatting use"""
+    id: int
+    text: str
+    created_at: str | None
+    is_reply: bool
+    author_id: str | None = None
+
+    @classmethod
+    def from_api(cls, data: dict) -> 'Tweet':
+        """Build from a v2 API tweet object"""
+        return cls(
+            int(data['id']),
+            data.get('text', ''),
+            data.get('created_at'),
+            data.get('in_reply_to_user_id') is not None,
+            data.get('author_id')
+        )
+
+
+by_snowflake = attrgetter('id')
+
+
+def parse_tweets(data: list, since_id=None) -> list[Tweet]:
+    """
+    Turn a page of v2 tweet objects into Tweets newer than since_id, newest first.
+    The API already returns pages newest first, so the sort is a linear check.
+    """
+    since = int(since_id) if since_id else 0
+    tweets = [tweet for tweet in map(Tweet.from_api, data or ()) if tweet.id > since]
+    tweets.sort(key=by_snowflake, reverse=True)
+    return tweets
@@ -0,0 +1,118 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class UsernameResolver:
+    """
+    Username -> (username, twitter_id) resolution in front of users/by.
+    Stored accounts are answered from the database first, everything else
+    from an LRU with separate TTLs for found and missing names. Names are
+    matched case-insensitively and concurrent lookups of the same name share
+    one request.
+    """
+
+    def __init__(self, lookup, account_queries, batch_size: int = 100, maxsize: int = 1024,
+                 ttl: float = 86400, negative_ttl: float = 600):
+        # lookup(usernames) -> {lowercase username: (username, twitter_id)} or None on failure
+        self.lookup = lookup
+        self.account_queries = account_queries
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = OrderedDict()
+        self.inflight = {}
+
+    def get_cached(self, key: str) -> tuple[bool, tuple | None]:
+        """Return (hit, value), a hit with value None is a cached "not found\""""
+        entry = self.cache.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.cache[key]
+            return False, None
+        self.cache.move_to_end(key)
+        return True, value
+
+    def store(self, key: str, value: tuple | None):
+        ttl = self.ttl if value else self.negative_ttl
+        self.cache[key] = (time.monotonic() + ttl, value)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    async def fetch(self, usernames: list[str]) -> dict:
+        """Look names up in batches, caching results of every batch that succeeded"""
+        results = {}
+        for start in range(0, len(usernames), self.batch_size):
+            batch = usernames[start:start + self.batch_size]
+            found = await self.lookup(batch)
+            if found is None:
+                # Failed requests are not proof that a name does not exist
+                continue
+            for username in batch:
+                key = username.lower()
+                results[key] = found.get(key)
+                self.store(key, results[key])
+        return results
+
+    async def resolve_many(self, usernames: list[str]) -> dict:
+        """Resolve usernames, returns {lowercase username: (username, twitter_id)} for found ones"""
+        resolved = {}
+        waiting = {}
+        missing = []
+        # Alice and alice are one lookup
+        names = {}
+        for username in usernames:
+            names.setdefault(username.lower(), username)
+
+        # IDs of stored accounts are authoritative over the cache and the API
+        stored = await self.account_queries.get_accounts_by_usernames(list(names))
+        for key, username in names.items():
+            account = stored.get(key)
+            if account:
+                metrics.USERNAME_CACHE_LOOKUPS.inc("stored")
+                resolved[key] = (account.twitter_username, account.twitter_id)
+                continue
+            hit, value = self.get_cached(key)
+            if hit:
+                metrics.USERNAME_CACHE_LOOKUPS.inc("hit")
+                if value:
+                    resolved[key] = value
+            elif key in self.inflight:
+                waiting[key] = self.inflight[key]
+            else:
+                metrics.USERNAME_CACHE_LOOKUPS.inc("miss")
+                missing.append(username)
+
+        if missing:
+            task = asyncio.ensure_future(self.fetch(missing))
+            keys = [username.lower() for username in missing]
+            for key in keys:
+                self.inflight[key] = task
+                waiting[key] = task
+
+            def clear(_, keys=keys, task=task):
+                for key in keys:
+                    if self.inflight.get(key) is task:
+                        del self.inflight[key]
+            task.add_done_callback(clear)
+
+        for key, task in waiting.items():
+            try:
+                value = (await asyncio.shield(task)).get(key)
+            except Exception as e:
+                logger.error(f"Username lookup failed: {e}")
+                continue
+            if value:
+                resolved[key] = value
+        return resolved
+
+    async def resolve(self, username: str) -> tuple | None:
+        """Resolve one username, preferring the monitored accounts table"""
+        return (await self.resolve_many([username])).get(username.lower())
@@ -0,0 +1,298 @@
+import time
+import asyncio
+import bisect
+import hashlib
+import logging
+import dataclasses
+import multiprocessing
+from config import Config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class HashRing:
+    """Consistent hash ring mapping twitter_ids onto shard ids"""
+
+    def __init__(self, nodes: list = (), replicas: int = 100):
+        self.replicas = replicas
+        self.keys = []
+        self.ring = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}:{replica}")
+            if key not in self.ring:
+                self.ring[key] = node
+                bisect.insort(self.keys, key)
+
+    def remove(self, node):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}:{replica}")
+            if self.ring.get(key) == node:
+                del self.ring[key]
+                self.keys.remove(key)
+
+    def get(self, key: str):
+        """Shard owning a key, or None when the ring is empty"""
+        if not self.keys:
+            return None
+        index = bisect.bisect(self.keys, self._hash(key)) % len(self.keys)
+        return self.ring[self.keys[index]]
+
+
+def shard_main(shard_id: int, config: Config, tokens: list, assignments, reports):
+    """Entry point of a shard worker process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - shard {shard_id} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(run_shard(shard_id, config, tokens, assignments, reports))
+    except KeyboardInterrupt:
+        pass
+
+
+async def report_metrics(shard_id: int, reports, interval: float, manager):
+    """Send this shard's metrics and token status to the coordinator for /metrics and /stats"""
+    while True:
+        await asyncio.sleep(interval)
+        reports.put((shard_id, metrics.REGISTRY.snapshot(), manager.token_status))
+
+
+async def run_shard(shard_id: int, config: Config, tokens: list, assignments, reports):
+    """Run a TwitterManager for the accounts the coordinator assigns to this shard"""
+    from telegram.ext import ApplicationBuilder
+    from apis.x import TwitterManager
+    from apis.tokens import TokenPool, BearerToken
+    from bot.delivery import TelegramDelivery
+    from db.queries import UserQueries, AccountQueries
+    from db.session import create_session_factory
+
+    engine, session_factory = create_session_factory(config.DATABASE_URL)
+    telegram_app = ApplicationBuilder().token(config.TELEGRAM_TOKEN).updater(None).build()
+    await telegram_app.initialize()
+
+    delivery = TelegramDelivery(
+        telegram_app,
+        workers=config.TELEGRAM_SEND_WORKERS,
+        global_rate=config.TELEGRAM_GLOBAL_RATE,
+        chat_rate=config.TELEGRAM_CHAT_RATE
+    )
+    delivery.start()
+    metrics.TELEGRAM_QUEUE_DEPTH.set_function(lambda: delivery.pending)
+
+    manager = TwitterManager(
+        config=config,
+        telegram_bot=telegram_app,
+        user_queries=UserQueries(session_factory, config=config),
+        account_queries=AccountQueries(session_factory),
+        delivery=delivery
+    )
+    # Each shard polls with its own subset of the token pool
+    manager.tokens = TokenPool([BearerToken(name, bearer) for name, bearer in tokens])
+    reporter = asyncio.create_task(
+        report_metrics(shard_id, reports, config.SHARD_REPORT_INTERVAL, manager)
+    )
+
+    try:
+        while True:
+            message = await asyncio.to_thread(assignments.get)
+            if message is None:
+                break
+
+            # twitter_ids in forgotten were deleted, the others moved to another shard
+            users, forgotten = message
+            users = set(users)
+            if not manager.monitoring:
+                await manager.monitor(list(users), notify=False)
+                continue
+
+            current = set(manager.monitored_users)
+            for user in current - users:
+                await manager.remove_monitored_user(user, forget_checkpoint=user[1] in forgotten)
+            await manager.add_monitored_users(list(users - current))
+            logger.info(f"Shard {shard_id} now monitors {len(users)} accounts")
+    finally:
+        reporter.cancel()
+        if manager.monitoring:
+            await manager.stop_monitoring(notify=False)
+        await manager.close()
+        await delivery.stop()
+        await telegram_app.shutdown()
+        await engine.dispose()
+
+
+class ShardCoordinator:
+    """
+    Spreads monitored accounts over worker processes by consistent hashing
+    of twitter_id and rebalances when accounts change or a worker dies.
+    """
+
+    def __init__(
+        self, config: Config, tokens: list, shard_count: int,
+        check_interval: float = 5, max_restart_delay: float = 300, stable_after: float = 60
+    ):
+        self.config = config
+        self.shard_count = shard_count
+        self.check_interval = check_interval
+        # Crash-looping shards are restarted with exponential backoff
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.failures = {}
+        self.started_at = {}
+        self.restart_at = {}
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = HashRing(range(shard_count))
+        self.processes = {}
+        self.queues = {}
+        self.assigned = {}
+        self.users = {}
+        # twitter_ids deleted since each shard's last assignment, shard -> set
+        self.forgotten = {}
+        # Latest token status reported by each shard
+        self.token_status = {}
+        # Shards report metric snapshots here, see collect()
+        self.reports = self.context.Queue()
+        self.collector = None
+
+        # Split tokens between shards, sharing them when there are too few
+        budget = config.TWITTER_REQUEST_BUDGET
+        if len(tokens) >= shard_count:
+            self.tokens = {shard: tokens[shard::shard_count] for shard in range(shard_count)}
+        else:
+            logger.warning(f"Only {len(tokens)} tokens for {shard_count} shards, shards will share tokens")
+            self.tokens = {shard: list(tokens) for shard in range(shard_count)}
+            # The per-token budget is split between the shards sharing each token
+            budget = max(budget // shard_count, 1)
+
+        # Shards must not shard again
+        self.shard_config = dataclasses.replace(
+            config,
+            MONITOR_SHARDS=0,
+            TWITTER_REQUEST_BUDGET=budget
+        )
+
+    def spawn(self, shard: int):
+        """Start (or restart) one shard process"""
+        queue = self.context.Queue()
+        process = self.context.Process(
+            target=shard_main,
+            args=(shard, self.shard_config, self.tokens[shard], queue, self.reports),
+            name=f"twitter-shard-{shard}",
+            daemon=True
+        )
+        process.start()
+        self.queues[shard] = queue
+        self.processes[shard] = process
+        self.started_at[shard] = time.monotonic()
+        self.assigned.pop(shard, None)
+        logger.info(f"Started shard {shard} (pid {process.pid})")
+
+    def rebalance(self):
+        """Send every shard whose account set changed its new assignment"""
+        assignments = {shard: [] for shard in self.processes}
+        for twitter_id, user in self.users.items():
+            shard = self.ring.get(twitter_id)
+            if shard in assignments:
+                assignments[shard].append(user)
+
+        for shard, users in assignments.items():
+            if self.assigned.get(shard) != set(users):
+                self.queues[shard].put((users, self.forgotten.pop(shard, set())))
+                self.assigned[shard] = set(users)
+                logger.info(f"Assigned {len(users)} accounts to shard {shard}")
+
+    async def start(self, users: list):
+        """Spawn the shards and hand out the initial assignment"""
+        self.users = {user[1]: user for user in users}
+        for shard in range(self.shard_count):
+            self.spawn(shard)
+        self.rebalance()
+        self.collector = asyncio.create_task(self.collect())
+
+    async def collect(self):
+        """Merge metric snapshots reported by shards into this process's registry"""
+        while True:
+            report = await asyncio.to_thread(self.reports.get)
+            if report is None:
+                break
+            shard, snapshot, token_status = report
+            metrics.REGISTRY.update_remote(f"shard-{shard}", snapshot)
+            self.token_status[shard] = token_status
+
+    def add_user(self, user: tuple):
+        self.add_users([user])
+
+    def add_users(self, users: list):
+        for user in users:
+            self.users[user[1]] = user
+        self.rebalance()
+
+    def remove_user(self, user: tuple, forget: bool = True):
+        """Stop monitoring a user, its shard drops the checkpoint unless forget is False"""
+        if self.users.pop(user[1], None) and forget:
+            shard = self.ring.get(user[1])
+            if shard is not None:
+                self.forgotten.setdefault(shard, set()).add(user[1])
+        self.rebalance()
+
+    def restart_delay(self, shard: int) -> float:
+        """Seconds to wait before restarting a shard that just died"""
+        now = time.monotonic()
+        if now - self.started_at.get(shard, now) >= self.stable_after:
+            # It ran long enough to count as healthy, forget earlier crashes
+            self.failures[shard] = 0
+        self.failures[shard] = self.failures.get(shard, 0) + 1
+        return min(self.check_interval * 2 ** (self.failures[shard] - 1), self.max_restart_delay)
+
+    async def watch(self):
+        """Restart dead shards in place, keeping their accounts on the same shard"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = time.monotonic()
+            for shard, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+
+                if shard not in self.restart_at:
+                    delay = self.restart_delay(shard)
+                    self.restart_at[shard] = now + delay
+                    logger.error(
+                        f"Shard {shard} exited with code {process.exitcode}, "
+                        f"restarting in {delay:.0f}s"
+                    )
+                if now < self.restart_at[shard]:
+                    continue
+
+                del self.restart_at[shard]
+                # spawn() clears the assignment, so the new process gets the full account set
+                self.spawn(shard)
+                self.rebalance()
+
+    async def stop(self, timeout: float = 15):
+        """Ask every shard to stop, terminating those that do not exit in time"""
+        for queue in self.queues.values():
+            queue.put(None)
+        for shard, process in self.processes.items():
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Terminating shard {shard}")
+                process.terminate()
+        self.processes = {}
+        self.queues = {}
+        self.assigned = {}
+        self.restart_at = {}
+        self.forgotten = {}
+        self.token_status = {}
+        if self.collector:
+            # Unblocks the reader thread
+            self.reports.put(None)
+            await self.collector
+            self.collector = None
+        metrics.REGISTRY.clear_remote()
@@ -0,0 +1,182 @@
+import re
+import asyncio
+import httpx
+import logging
+from apis.records import Tweet, loads
+
+logger = logging.getLogger(__name__)
+
+class TwitterStream:
+    """
+    Filtered-stream ingestion for a TwitterManager.
+    Keeps one long-lived connection whose rules are generated from the
+    monitored account list, reconnects with backoff and replays anything
+    missed while disconnected through the regular since_id polling path.
+    """
+
+    RULE_TAG = "desix-monitor"
+    RULES_ENDPOINT = "tweets/search/stream/rules"
+    STREAM_ENDPOINT = "tweets/search/stream"
+
+    def __init__(self, manager, read_timeout: float = 60, max_backoff: float = 320):
+        self.manager = manager
+        # Twitter sends a keep-alive newline every 20 seconds
+        self.read_timeout = read_timeout
+        self.max_backoff = max_backoff
+        self.users_by_id = {}
+        self.connected = False
+        # Checkpoints captured when the connection dropped, replayed after reconnecting
+        self.replay_from = None
+        self.replay_tasks = set()
+
+    def plan_rules(self, existing: list) -> list[list]:
+        """
+        Chunk the monitored users into rules, keeping each user in the rule it is
+        already in so one added or removed account changes a single rule value
+        """
+        limit = self.manager.search_query_limit
+        chunks = []
+        assigned = set()
+        for value in existing:
+            chunk = [
+                self.users_by_id[user_id] for user_id in dict.fromkeys(re.findall(r'from:(\d+)', value))
+                if user_id in self.users_by_id and user_id not in assigned
+            ]
+            if chunk:
+                chunks.append(chunk)
+                assigned.update(user[1] for user in chunk)
+
+        for user_id, user in self.users_by_id.items():
+            if user_id in assigned:
+                continue
+            # Append to the last rule with room left, or open a new one
+            if chunks and len(self.manager.build_search_query(chunks[-1] + [user])) <= limit:
+                chunks[-1].append(user)
+            else:
+                chunks.append([user])
+        return chunks
+
+    async def sync_rules(self, users: list):
+        """Make the stream rules match the given (username, user_id) list"""
+        self.users_by_id = {user_id: (username, user_id) for username, user_id in users}
+
+        response = await self.manager.make_request(self.RULES_ENDPOINT, {})
+        if response is None:
+            logger.error("Could not fetch filtered stream rules")
+            return
+        existing = {
+            rule['value']: rule['id']
+            for rule in response.get('data', [])
+            if rule.get('tag') == self.RULE_TAG
+        }
+        desired = {self.manager.build_search_query(chunk) for chunk in self.plan_rules(list(existing))}
+
+        stale = [rule_id for value, rule_id in existing.items() if value not in desired]
+        missing = [value for value in desired if value not in existing]
+
+        # Add before deleting so accounts whose rule changes stay matched in between
+        if missing:
+            added = await self.manager.make_request(
+                self.RULES_ENDPOINT, {}, method="POST",
+                json={"add": [{"value": value, "tag": self.RULE_TAG} for value in missing]}
+            )
+            failed = [
+                error for error in (added or {}).get('errors', [])
+                if error.get('title') != 'DuplicateRule'
+            ]
+            if added is None or failed:
+                logger.error(f"Could not add filtered stream rules, keeping stale ones: {added}")
+                return
+        if stale:
+            await self.manager.make_request(
+                self.RULES_ENDPOINT, {}, method="POST",
+                json={"delete": {"ids": stale}}
+            )
+        logger.info(f"Synced stream rules: {len(missing)} added, {len(stale)} removed")
+
+    async def run(self):
+        """Consume the stream until cancelled, reconnecting with backoff"""
+        backoff = 1
+        try:
+            while self.manager.monitoring:
+                try:
+                    await self.consume()
+                    backoff = 1
+                except asyncio.CancelledError:
+                    raise
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code == 429:
+                        backoff = max(backoff, 60)
+                    logger.error(f"Filtered stream rejected connection: {e}")
+                except Exception as e:
+                    logger.error(f"Filtered stream disconnected: {e}")
+                finally:
+                    if self.connected and self.replay_from is None:
+                        # Keep the oldest snapshot across failed reconnect attempts
+                        self.replay_from = {
+                            user: self.manager.last_tweets.get(user)
+                            for user in self.users_by_id.values()
+                        }
+                    self.connected = False
+
+                logger.info(f"Reconnecting to filtered stream in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            for task in self.replay_tasks:
+                task.cancel()
+            self.replay_tasks.clear()
+
+    def start_replay(self):
+        """
+        Replay the disconnected window once the new connection is up, so every
+        tweet arrives through either the replay or the stream
+        """
+        if self.replay_from is None:
+            return
+        checkpoints, self.replay_from = self.replay_from, None
+        task = asyncio.create_task(self.manager.replay_missed(checkpoints))
+        self.replay_tasks.add(task)
+        task.add_done_callback(self.replay_tasks.discard)
+
+    async def consume(self):
+        """Hold one stream connection open and hand every tweet to the manager"""
+        token = self.manager.tokens.select(self.STREAM_ENDPOINT)
+        if token is None:
+            raise RuntimeError("No Twitter token available for the filtered stream")
+
+        params = {
+            "tweet.fields": "created_at,author_id,in_reply_to_user_id"
+        }
+        timeout = httpx.Timeout(self.manager.client.timeout.connect, read=self.read_timeout)
+        async with self.manager.client.stream(
+            "GET", self.STREAM_ENDPOINT,
+            params=params, headers=token.headers, timeout=timeout
+        ) as response:
+            if response.status_code == 429:
+                self.manager.tokens.mark_exhausted(token, self.STREAM_ENDPOINT, response.headers)
+            response.raise_for_status()
+            self.connected = True
+            logger.info("Connected to filtered stream")
+            self.start_replay()
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue  # keep-alive
+                try:
+                    payload = loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping malformed stream line: {line[:100]}")
+                    continue
+
+                tweet_data = payload.get('data')
+                if not tweet_data:
+                    continue
+                tweet = Tweet.from_api(tweet_data)
+                user = self.users_by_id.get(tweet.author_id)
+                if user is None:
+                    continue
+                try:
+                    await self.manager.handle_pushed_tweet(user, tweet)
+                except Exception as e:
+                    logger.error(f"Error handling streamed tweet for @{user[0]}: {e}")
@@ -0,0 +1,154 @@
+import re
+import datetime
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Numeric path segments (user IDs, tweet IDs) share one rate-limit window
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+class BearerToken:
+    """A bearer token and its rate-limit windows, tracked per endpoint"""
+
+    def __init__(self, name: str, bearer: str):
+        self.name = name
+        self.bearer = bearer
+        self.headers = {"Authorization": f"Bearer {bearer}"}
+        self.authorized = True
+        self.requests = 0
+        self.windows = {}
+
+    def window(self, endpoint: str) -> dict:
+        """Get the rate-limit window for an endpoint key"""
+        window = self.windows.get(endpoint)
+        if window is None:
+            window = self.windows[endpoint] = {'remaining': None, 'reset': None, 'warned': False}
+        return window
+
+    def is_cooling(self, endpoint: str, now: datetime.datetime = None) -> bool:
+        """Whether this token has exhausted the endpoint's window and it has not reset yet"""
+        window = self.windows.get(endpoint)
+        if not window or window['remaining'] != 0:
+            return False
+        now = now or datetime.datetime.now()
+        return window['reset'] is None or window['reset'] > now
+
+
+class TokenPool:
+    """Pool of bearer tokens that picks the one with the most remaining quota"""
+
+    def __init__(self, tokens: list[BearerToken]):
+        self.tokens = tokens
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'TokenPool':
+        """Load the DY/DX tokens plus any extra TWITTER_BEARER_TOKENS"""
+        named = [
+            ('dy', config.DY_TWITTER_BEARER_TOKEN),
+            ('dx', config.DX_TWITTER_BEARER_TOKEN),
+        ]
+        named += [
+            (f"t{index}", bearer)
+            for index, bearer in enumerate(config.TWITTER_BEARER_TOKENS, start=1)
+        ]
+
+        tokens = []
+        seen = set()
+        for name, bearer in named:
+            if bearer and bearer not in seen:
+                seen.add(bearer)
+                tokens.append(BearerToken(name, bearer))
+
+        logger.info(f"Loaded {len(tokens)} Twitter bearer tokens")
+        return cls(tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @staticmethod
+    def endpoint_key(endpoint: str) -> str:
+        """Normalize an endpoint path to its rate-limit window key"""
+        return ID_SEGMENT.sub('/:id', f"/{endpoint.strip('/')}").lstrip('/')
+
+    @property
+    def authorized(self) -> list[BearerToken]:
+        return [token for token in self.tokens if token.authorized]
+
+    def usable(self, endpoint: str) -> int:
+        """Number of authorized tokens not cooling down on an endpoint"""
+        key = self.endpoint_key(endpoint)
+        now = datetime.datetime.now()
+        return sum(not token.is_cooling(key, now) for token in self.authorized)
+
+    def select(self, endpoint: str, exclude: set = None) -> BearerToken | None:
+        """Choose the authorized, non-cooling token with the most remaining quota"""
+        key = self.endpoint_key(endpoint)
+        now = datetime.datetime.now()
+        candidates = [
+            token for token in self.authorized
+            if not token.is_cooling(key, now) and token.name not in (exclude or ())
+        ]
+        if not candidates:
+            return None
+
+        def quota(token: BearerToken):
+            window = token.window(key)
+            remaining = window['remaining']
+            if remaining is None or (window['reset'] and window['reset'] <= now):
+                # Unused or already reset windows are assumed to be full
+                remaining = float('inf')
+            return remaining, -token.requests
+
+        return max(candidates, key=quota)
+
+    def update(self, token: BearerToken, endpoint: str, headers) -> dict:
+        """Record rate-limit headers from a response, returns the endpoint window"""
+        window = token.window(self.endpoint_key(endpoint))
+        token.requests += 1
+
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if reset is not None:
+            reset_time = datetime.datetime.fromtimestamp(int(reset))
+            if window['reset'] != reset_time:
+                window['warned'] = False
+            window['reset'] = reset_time
+        if remaining is not None:
+            window['remaining'] = int(remaining)
+        return window
+
+    def mark_exhausted(self, token: BearerToken, endpoint: str, headers=None):
+        """Put a token into cooldown for an endpoint after a 429"""
+        window = token.window(self.endpoint_key(endpoint))
+        window['remaining'] = 0
+        reset = headers.get('x-rate-limit-reset') if headers is not None else None
+        if reset is not None:
+            window['reset'] = datetime.datetime.fromtimestamp(int(reset))
+        elif window['reset'] is None or window['reset'] <= datetime.datetime.now():
+            # Twitter windows are 15 minutes long
+            window['reset'] = datetime.datetime.now() + datetime.timedelta(minutes=15)
+
+    def next_reset(self, endpoint: str) -> datetime.datetime | None:
+        """Earliest reset time among tokens cooling down on an endpoint"""
+        key = self.endpoint_key(endpoint)
+        resets = [
+            token.windows[key]['reset'] for token in self.authorized
+            if token.is_cooling(key) and token.windows[key]['reset']
+        ]
+        return min(resets) if resets else None
+
+    def status(self) -> dict:
+        """Snapshot of every token's authorization and most constrained window"""
+        status = {}
+        for token in self.tokens:
+            windows = [window for window in token.windows.values() if window['remaining'] is not None]
+            tightest = min(windows, key=lambda window: window['remaining'], default=None)
+            status[token.name] = {
+                'authorized': token.authorized,
+                'requests': token.requests,
+                'rate_limit_remaining': tightest['remaining'] if tightest else None,
+                'rate_limit_reset': tightest['reset'] if tightest else None,
+            }
+        return status
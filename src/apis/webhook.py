@@ -0,0 +1,103 @@
+import hmac
+import base64
+import hashlib
+import datetime
+import logging
+from fastapi import APIRouter, HTTPException, Request
+from apis.records import Tweet
+
+logger = logging.getLogger(__name__)
+
+class TwitterWebhook:
+    """
+    Account Activity API receiver.
+    Answers CRC challenges, verifies payload signatures and feeds tweet
+    events for monitored accounts into the TwitterManager delivery path.
+    """
+
+    def __init__(self, manager, account_queries, consumer_secret: str, webhook_id: str = None):
+        self.manager = manager
+        self.account_queries = account_queries
+        self.consumer_secret = consumer_secret.encode()
+        self.webhook_id = webhook_id
+        # twitter_ids whose webhook_id has already been stored
+        self.recorded = set()
+        # Events posted to a non-leader worker are queued for the leader
+        self.manager.relay.register('account_activity', self.handle_event)
+
+    def _digest(self, payload: bytes) -> str:
+        digest = hmac.new(self.consumer_secret, payload, hashlib.sha256).digest()
+        return "sha256=" + base64.b64encode(digest).decode()
+
+    def crc_response(self, crc_token: str) -> dict:
+        """Build the response to a CRC challenge"""
+        return {"response_token": self._digest(crc_token.encode())}
+
+    def verify_signature(self, body: bytes, signature: str) -> bool:
+        """Check the x-twitter-webhooks-signature header against the raw body"""
+        if not signature:
+            return False
+        return hmac.compare_digest(self._digest(body), signature)
+
+    @staticmethod
+    def to_tweet(event: dict) -> Tweet:
+        """Convert a v1.1 tweet_create_event into a Tweet record"""
+        text = event.get('extended_tweet', {}).get('full_text') or event.get('text', '')
+        created_at = event.get('created_at')
+        if created_at:
+            created_at = datetime.datetime.strptime(
+                created_at, "%a %b %d %H:%M:%S %z %Y"
+            ).isoformat()
+        return Tweet(
+            int(event['id_str']),
+            text,
+            created_at,
+            event.get('in_reply_to_user_id_str') is not None,
+            event.get('user', {}).get('id_str')
+        )
+
+    async def handle_event(self, payload: dict):
+        """Deliver new tweets authored by a monitored account"""
+        for_user_id = payload.get('for_user_id')
+        events = payload.get('tweet_create_events') or []
+        if not for_user_id or not events or not self.manager.monitoring:
+            return
+
+        account = await self.account_queries.get_account_by_twitter_id(for_user_id)
+        if not account:
+            logger.warning(f"Webhook event for unmonitored user {for_user_id}")
+            return
+
+        user = (account.twitter_username, account.twitter_id)
+        if self.webhook_id and for_user_id not in self.recorded:
+            if account.webhook_id != self.webhook_id:
+                await self.account_queries.update_webhook_id(account.id, self.webhook_id)
+            self.recorded.add(for_user_id)
+            self.manager.mark_push_subscribed(user)
+
+        for event in events:
+            # Skip mentions by others and retweets
+            if event.get('user', {}).get('id_str') != for_user_id or 'retweeted_status' in event:
+                continue
+            await self.manager.handle_pushed_tweet(user, self.to_tweet(event))
+
+    def router(self) -> APIRouter:
+        """FastAPI routes for the CRC check and event delivery"""
+        router = APIRouter()
+
+        @router.get("/webhooks/twitter")
+        async def crc_check(crc_token: str):
+            return self.crc_response(crc_token)
+
+        @router.post("/webhooks/twitter")
+        async def receive_event(request: Request):
+            body = await request.body()
+            if not self.verify_signature(body, request.headers.get('x-twitter-webhooks-signature')):
+                raise HTTPException(status_code=403, detail="Invalid signature")
+            try:
+                await self.manager.relay.send('account_activity', await request.json())
+            except Exception as e:
+                logger.error(f"Error handling webhook event: {e}")
+            return {"ok": True}
+
+        return router
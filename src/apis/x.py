@@ -1,142 +1,293 @@
 import asyncio
-import requests
+import heapq
+import httpx
+import time
 import datetime
-import pytz
 import logging
 from config import Config
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from apis.tokens import TokenPool, BearerToken
+from apis.stream import TwitterStream
+from apis.shards import ShardCoordinator
+from apis.resolver import UsernameResolver
+from apis.formatter import TweetFormatter
+from apis.records import Tweet, loads, parse_tweets, snowflake_at
+from apis.dedup import DedupIndex
+from leader import LeaderRelay
+import metrics
+from telegram import InlineKeyboardMarkup
+
+try:
+    import h2  # noqa: F401 - only needed to enable HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Telegram rejects messages longer than this many characters
+TELEGRAM_MESSAGE_LIMIT = 4096
+# users/by accepts at most this many usernames per request
+USERS_LOOKUP_LIMIT = 100
+
+# Only the fields the formatter reads, id and text are always returned
+TWEET_FIELDS = "created_at,in_reply_to_user_id"
+SEARCH_TWEET_FIELDS = "created_at,author_id,in_reply_to_user_id"
+# Page sizes for users/:id/tweets, fixed steps keep identical requests coalescable
+FETCH_PAGE_SIZES = (5, 10, 20, 50, 100)
+# Pages followed per poll when a burst fills the first one
+MAX_FETCH_PAGES = 5
+# Recent search rejects a since_id older than 7 days, keep an hour of margin
+SEARCH_WINDOW = datetime.timedelta(days=7) - datetime.timedelta(hours=1)
+
+class PollScheduler:
+    """
+    Adaptive per-account poll scheduling.
+    Accounts sit in a heap keyed by their next poll time. Empty polls back off
+    exponentially, activity snaps the interval back to the minimum, and a
+    token bucket keeps the overall request rate under the current budget.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, backoff: float, budget_per_window: int, window: int = 900):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.heap = []
+        self.accounts = {}
+        self.sequence = 0
+
+        # Request budget shared by every account
+        self.window = window
+        self.budget_tokens = 0.0
+        self.set_budget(budget_per_window)
+        self.budget_tokens = self.budget_capacity
+        self.budget_updated = time.monotonic()
+
+    def set_budget(self, budget_per_window: int):
+        """Change the refill rate, e.g. when tokens are added, exhausted or recover"""
+        self.budget_rate = budget_per_window / self.window
+        self.budget_capacity = max(self.budget_rate * self.min_interval, 1)
+        self.budget_tokens = min(self.budget_tokens, self.budget_capacity)
+
+    def _push(self, user: tuple, next_poll: float):
+        self.accounts[user]['next_poll'] = next_poll
+        self.sequence += 1
+        heapq.heappush(self.heap, (next_poll, self.sequence, user))
+
+    def add(self, user: tuple, delay: float = 0):
+        """Schedule a user for polling after delay seconds"""
+        if user not in self.accounts:
+            self.accounts[user] = {
+                'interval': self.min_interval,
+                'rate': 0.0,
+                'last_poll': None,
+                'next_poll': None
+            }
+        self._push(user, time.monotonic() + delay)
+
+    def remove(self, user: tuple):
+        """Stop scheduling a user; stale heap entries are skipped lazily"""
+        self.accounts.pop(user, None)
+
+    def reset(self, users: list):
+        """Replace the schedule with the given users, all due now"""
+        self.heap = []
+        self.accounts = {}
+        for user in users:
+            self.add(user)
+
+    def pop_due(self, now: float = None) -> list:
+        """Pop every user whose next poll time has passed"""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            next_poll, _, user = heapq.heappop(self.heap)
+            account = self.accounts.get(user)
+            if account is None or account['next_poll'] != next_poll:
+                continue
+            account['next_poll'] = None
+            due.append(user)
+        return due
+
+    def take_budget(self, requested: int) -> int:
+        """Take up to requested request tokens from the budget, returns tokens granted"""
+        now = time.monotonic()
+        self.budget_tokens = min(
+            self.budget_capacity,
+            self.budget_tokens + (now - self.budget_updated) * self.budget_rate
+        )
+        self.budget_updated = now
+        granted = min(requested, int(self.budget_tokens))
+        self.budget_tokens -= granted
+        return granted
+
+    def defer(self, user: tuple):
+        """Put a user that could not be polled back at the front of the queue"""
+        if user in self.accounts:
+            self._push(user, time.monotonic() + 1 / max(self.budget_rate, 1e-6))
+
+    def record(self, user: tuple, tweets: list = None):
+        """Update a user's observed posting rate and schedule its next poll"""
+        account = self.accounts.get(user)
+        if account is None:
+            return
+
+        now = time.monotonic()
+        count = len(tweets) if tweets else 0
+        if account['last_poll'] is not None:
+            elapsed = max(now - account['last_poll'], 1e-6)
+            account['rate'] = 0.3 * (count / elapsed) + 0.7 * account['rate']
+        account['last_poll'] = now
+
+        if count:
+            account['interval'] = self.min_interval
+            self.record_latencies(tweets)
+        else:
+            interval = account['interval'] * self.backoff
+            if account['rate'] > 0:
+                # Don't back off past about half the account's expected posting gap
+                interval = min(interval, max(self.min_interval, 0.5 / account['rate']))
+            account['interval'] = min(interval, self.max_interval)
+
+        self._push(user, now + account['interval'])
+
+    def expected_tweets(self, user: tuple) -> float:
+        """Tweets a user is expected to post before its next poll, from its observed rate"""
+        account = self.accounts.get(user)
+        if account is None:
+            return 0.0
+        return account['rate'] * account['interval']
+
+    def record_latencies(self, tweets: list):
+        """Record how long after creation each tweet was detected"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for tweet in tweets:
+            try:
+                created_at = datetime.datetime.fromisoformat(tweet.created_at.replace('Z', '+00:00'))
+            except (AttributeError, ValueError):
+                continue
+            metrics.DETECTION_LATENCY_SECONDS.observe(max((now - created_at).total_seconds(), 0))
+
+    def next_delay(self) -> float:
+        """Seconds until the next scheduled poll"""
+        if not self.heap:
+            return self.min_interval
+        return min(max(self.heap[0][0] - time.monotonic(), 0.5), self.max_interval)
+
+
 class TwitterManager:
-    def __init__(self, config: Config, telegram_bot, user_queries, account_queries):
-        self.base_url = "https://api.twitter.com/2"
-        self.headers_dx = {
-            "Authorization": f"Bearer {config.DX_TWITTER_BEARER_TOKEN}"
-        }
-        self.headers_dy = {
-            "Authorization": f"Bearer {config.DY_TWITTER_BEARER_TOKEN}"
-        }
+    def __init__(self, config: Config, telegram_bot, user_queries, account_queries, delivery):
+        self.base_url = config.TWITTER_API_BASE_URL
+        self.tokens = TokenPool.from_config(config)
         
         self.poll_interval = config.TWITTER_POLL_INTERVAL
+        self.scheduler = PollScheduler(
+            min_interval=config.TWITTER_POLL_INTERVAL,
+            max_interval=config.TWITTER_MAX_POLL_INTERVAL,
+            backoff=config.TWITTER_POLL_BACKOFF,
+            budget_per_window=config.TWITTER_REQUEST_BUDGET * max(len(self.tokens), 1)
+        )
+        # Requests per window each usable bearer token adds to the scheduler budget
+        self.request_budget = config.TWITTER_REQUEST_BUDGET
+        self.poll_semaphore = asyncio.Semaphore(config.TWITTER_POLL_CONCURRENCY)
+        self.batch_mode = config.TWITTER_BATCH_MODE
+        self.search_query_limit = config.TWITTER_SEARCH_QUERY_LIMIT
+        # Newest tweet ID each batched user has been searched up to, even without tweets of its own
+        self.search_watermarks = {}
+
+        # Digest mode coalesces each account's new tweets into one message
+        self.digest_mode = config.TWITTER_DIGEST_MODE
+        self.digest_window = config.TWITTER_DIGEST_WINDOW
+        self.digest_buffer = {}
+        self.digest_started = {}
+        self.digest_task = None
+
+        # Ingestion mode: "poll" (default) or "stream" (filtered stream)
+        self.ingestion_mode = config.TWITTER_INGESTION_MODE
+        self.stream = TwitterStream(self)
+
+        # Accounts delivered by Account Activity webhooks are not polled
+        self.push_users = set()
         self.monitoring = False
-        self.monitored_users = []
+        # Live account registry, twitter_id -> (username, twitter_id)
+        self.registry = {}
         self.last_tweets = {}
+        self.pending_checkpoints = {}
+        self.checkpoint_flush_interval = config.CHECKPOINT_FLUSH_INTERVAL
+        self.checkpoint_task = None
+        # Recently delivered tweet IDs, shared by every ingestion path
+        self.dedup = DedupIndex(account_queries, capacity=config.DEDUP_CAPACITY)
         self.telegram_bot = telegram_bot
+        self.delivery = delivery
         self.user_queries = user_queries
         self.account_queries = account_queries
         self.monitor_task = None
-        
-        # Token status tracking
-        self.token_status = {
-            'dy': {'authorized': True, 'rate_limit_remaining': None, 'rate_limit_reset': None},
-            'dx': {'authorized': True, 'rate_limit_remaining': None, 'rate_limit_reset': None}
-        }
-        self.current_token = 'dy'  # Start with dy token
-        self.rate_limit_warning_threshold = 10
+        # Monotonic time of the last completed monitor loop iteration
+        self.last_cycle_at = None
+        # Only the leader worker process runs the monitor
+        self.is_leader = True
+        # Account changes made on other workers are queued for the leader
+        self.relay = LeaderRelay(account_queries, interval=config.LEADER_EVENT_INTERVAL)
+        self.relay.register('add_users', self.on_users_added)
+        self.relay.register('remove_user', self.on_user_removed)
+        self.relay.register('set_monitoring', self.on_set_monitoring)
+        self.relay.register('roles_changed', self.on_roles_changed)
+        # Polling is split across shard processes when MONITOR_SHARDS > 1
+        self.config = config
+        self.shard_count = config.MONITOR_SHARDS
+        self.coordinator = None
 
-    def get_next_token(self):
-        """Get the next available token for API requests"""
-        tokens = ['dy', 'dx']
-        if all(self.token_status[t]['authorized'] for t in tokens):
-            # If both tokens are authorized, alternate between them
-            self.current_token = 'dx' if self.current_token == 'dy' else 'dy'
-        else:
-            # If only one token is authorized, use that one
-            self.current_token = next(
-                (t for t in tokens if self.token_status[t]['authorized']),
-                None
+        # Pooled keep-alive HTTP client shared by every endpoint
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(config.TWITTER_HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.TWITTER_HTTP_POOL_SIZE,
+                max_keepalive_connections=config.TWITTER_HTTP_POOL_SIZE
             )
-        return self.current_token
-    
-    def get_current_headers(self):
-        """Get the headers for the current token"""
-        token = self.get_next_token()
-        return self.headers_dy if token == 'dy' else self.headers_dx
-
-    def create_tweet_url(self, username: str, tweet_id: str) -> str:
-        """Create the URL for a tweet"""
-        return f"https://twitter.com/{username}/status/{tweet_id}"
-
-    @staticmethod
-    def convert_to_new_york_time(utc_time):
-        utc_zone = pytz.utc
-        ny_zone = pytz.timezone('America/New_York')
-        utc_time = utc_zone.localize(utc_time)
-        ny_time = utc_time.astimezone(ny_zone)
-        return ny_time.strftime("%I:%M %p")
-
-    @staticmethod
-    def shorten_text(text: str, max_length: int = 200) -> str:
-        """Shorten the text to a maximum length"""
-        if len(text) > max_length:
-            return text[:max_length - 3] + "..."
-        return text
-
-    def format_reply_message(self, username: str, tweet) -> tuple[str, InlineKeyboardMarkup]:
-        """Format the reply message for Telegram with inline keyboard buttons"""
-        text = self.shorten_text(tweet['text'])
-        tweet_link = self.create_tweet_url(username, tweet['id'])
-        utc_time = datetime.datetime.utcnow()
-        timestamp = self.convert_to_new_york_time(utc_time)
-        
-        # Create inline keyboard with buttons
-        keyboard = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton("💬 View Reply", url=tweet_link),
-                InlineKeyboardButton("👤 View Profile", url=f"https://twitter.com/{username}")
-            ]
-        ])
-        
-        message = (
-            f"<b>Reply | @{username}</b>\n\n"
-            f"{text}\n\n"
-            f"🕒 {timestamp}"
         )
         
-        return message, keyboard
-
-    def format_tweet_message(self, username: str, tweet) -> tuple[str, InlineKeyboardMarkup]:
-        """Format the tweet message for Telegram with inline keyboard buttons"""
-        text = self.shorten_text(tweet['text'])
-        tweet_link = self.create_tweet_url(username, tweet['id'])
-        utc_time = datetime.datetime.utcnow()
-        timestamp = self.convert_to_new_york_time(utc_time)
-        
-        # Create inline keyboard with buttons
-        keyboard = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton("🔗 View Tweet", url=tweet_link),
-                InlineKeyboardButton("👤 View Profile", url=f"https://twitter.com/{username}")
-            ]
-        ])
-        
-        message = (
-            f"<b>Tweet | @{username}</b>\n\n"
-            f"{text}\n\n"
-            f"🕒 {timestamp}"
+        self.rate_limit_warning_threshold = 10
+        # Message formatting with per-account templates
+        self.formatter = TweetFormatter()
+        # Single-flight GET requests, request_key -> task
+        self.inflight_requests = {}
+
+        # Cached username -> twitter_id lookups, including names that do not exist
+        self.resolver = UsernameResolver(
+            self.lookup_usernames,
+            account_queries,
+            batch_size=USERS_LOOKUP_LIMIT,
+            maxsize=config.USERNAME_CACHE_SIZE,
+            ttl=config.USERNAME_CACHE_TTL,
+            negative_ttl=config.USERNAME_NEGATIVE_TTL
         )
-        
-        return message, keyboard
+
+    @property
+    def monitored_users(self) -> list[tuple]:
+        """Users currently monitored, in the order they were added"""
+        return list(self.registry.values())
+
+    @property
+    def token_status(self) -> dict:
+        """Per-token authorization, request count and tightest rate-limit window"""
+        if self.coordinator:
+            # The tokens are used by the shards, this process's pool sits idle
+            return {
+                f"{name} (shard {shard})": status
+                for shard, statuses in sorted(self.coordinator.token_status.items())
+                for name, status in statuses.items()
+            }
+        return self.tokens.status()
 
     async def send_to_telegram(self, chat_id: int, message: str, tweet_url: str = None, reply_markup: InlineKeyboardMarkup = None):
-        """Send a message to Telegram with inline keyboard buttons"""
+        """Queue a message for Telegram delivery with inline keyboard buttons"""
         try:
-            kwargs = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': True  # Prevent URL preview for cleaner look
-            }
-            
-            if reply_markup:
-                kwargs['reply_markup'] = reply_markup
-                
-            await self.telegram_bot.bot.send_message(**kwargs)
+            self.delivery.enqueue(chat_id, message, reply_markup=reply_markup)
         except Exception as e:
-            logger.error(f"Error sending message to Telegram: {e}")
+            logger.error(f"Error queueing message for Telegram: {e}")
 
-    async def fetch_latest_activity(self, user: set, headers) -> tuple[str, str]:
+    async def fetch_latest_activity(self, user: set) -> tuple[str, str]:
         """
         Fetch the most recent tweet and reply for a user
         Returns tuple of (latest_tweet_id, latest_reply_id)
@@ -145,15 +296,15 @@ class TwitterManager:
             username, user_id = user
             params = {
                 "max_results": 5,  # Increase to better chance of finding both tweet and reply
-                "tweet.fields": "created_at,text,conversation_id,in_reply_to_user_id",
+                "tweet.fields": TWEET_FIELDS,
                 "exclude": "retweets"
             }
             
             endpoint = f"users/{user_id}/tweets"
-            response = await self.make_request(endpoint, params, headers)
+            response = await self.make_request(endpoint, params)
             
             if response and 'data' in response:
-                tweets = response['data']
+                tweets = parse_tweets(response['data'])
                 
                 # Find latest regular tweet and reply
                 latest_tweet = None
@@ -162,13 +313,11 @@ class TwitterManager:
                 latest_reply_data = None
                 
                 for tweet in tweets:
-                    is_reply = tweet.get('in_reply_to_user_id') is not None
-                    
-                    if is_reply and latest_reply is None:
-                        latest_reply = tweet['id']
+                    if tweet.is_reply and latest_reply is None:
+                        latest_reply = tweet.id
                         latest_reply_data = tweet
-                    elif not is_reply and latest_tweet is None:
-                        latest_tweet = tweet['id']
+                    elif not tweet.is_reply and latest_tweet is None:
+                        latest_tweet = tweet.id
                         latest_tweet_data = tweet
                     
                     # Break if we found both
@@ -181,10 +330,13 @@ class TwitterManager:
                 )
                 
                 # Send the latest tweet or reply to telegram with inline keyboard
-                chat_ids = self.user_queries.get_admin_chat_ids()
+                chat_ids = await self.user_queries.get_admin_chat_ids()
+                fresh = self.dedup.claim([tweet for tweet in (latest_tweet_data, latest_reply_data) if tweet])
+                latest_tweet_data = latest_tweet_data if latest_tweet_data in fresh else None
+                latest_reply_data = latest_reply_data if latest_reply_data in fresh else None
                 
                 if latest_tweet_data:
-                    message, keyboard = self.format_tweet_message(user[0], latest_tweet_data)
+                    message, keyboard = self.formatter.format(user[0], latest_tweet_data)
                     for chat_id in chat_ids:
                         await self.send_to_telegram(
                             chat_id=chat_id,
@@ -193,7 +345,7 @@ class TwitterManager:
                         )
                 
                 if latest_reply_data:
-                    message, keyboard = self.format_reply_message(user[0], latest_reply_data)
+                    message, keyboard = self.formatter.format(user[0], latest_reply_data)
                     for chat_id in chat_ids:
                         await self.send_to_telegram(
                             chat_id=chat_id,
@@ -203,7 +355,7 @@ class TwitterManager:
                 
                 # Return the most recent ID between tweet and reply
                 if latest_tweet and latest_reply:
-                    return max(int(latest_tweet), int(latest_reply))
+                    return max(latest_tweet, latest_reply)
                 return latest_tweet or latest_reply or None
             
             return None
@@ -212,82 +364,119 @@ class TwitterManager:
             logger.error(f"Error fetching initial tweets for @{username}: {e}")
             return None
     
-    async def make_request(self, endpoint: str, params: dict, headers: dict):
-        """Make an async request to the Twitter API with authorization and rate limit handling"""
-        try:
-            token_type = 'dy' if headers == self.headers_dy else 'dx'
-            
-            # Skip request if token is unauthorized
-            if not self.token_status[token_type]['authorized']:
-                logger.warning(f"Skipping request with unauthorized {token_type.upper()} token")
+    @staticmethod
+    def request_key(method: str, endpoint: str, params: dict) -> tuple:
+        """Identify a request by method, endpoint and normalized params"""
+        normalized = tuple(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+        return method.upper(), endpoint.strip('/'), normalized
+
+    async def make_request(self, endpoint: str, params: dict, method: str = "GET", json: dict = None):
+        """
+        Make an async request to the Twitter API.
+        Identical GET requests already in flight share one HTTP call and its
+        parsed response, so callers must not modify the returned data.
+        """
+        if method.upper() != "GET":
+            return await self.send_request(endpoint, params, method, json)
+
+        key = self.request_key(method, endpoint, params)
+        task = self.inflight_requests.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.send_request(endpoint, params, method))
+            self.inflight_requests[key] = task
+            task.add_done_callback(lambda _: self.inflight_requests.pop(key, None))
+        else:
+            metrics.TWITTER_COALESCED_REQUESTS.inc()
+            logger.debug(f"Joined in-flight request for {self.tokens.endpoint_key(endpoint)}")
+
+        # A cancelled caller must not cancel the request others are waiting on
+        return await asyncio.shield(task)
+
+    async def send_request(self, endpoint: str, params: dict, method: str = "GET", json: dict = None):
+        """Send one request using the token with the most remaining quota"""
+        tried = set()
+        while True:
+            token = self.tokens.select(endpoint, exclude=tried)
+            if token is None:
+                logger.warning(f"No Twitter token available for {self.tokens.endpoint_key(endpoint)}")
                 return None
-            
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: requests.get(
-                    f"{self.base_url}/{endpoint}",
-                    params=params,
-                    headers=headers
+            tried.add(token.name)
+
+            endpoint_key = self.tokens.endpoint_key(endpoint)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(
+                    method, endpoint, params=params, json=json, headers=token.headers
                 )
-            )
-            
-            if response.status_code == 401:  # Unauthorized
-                await self.handle_unauthorized_token(token_type)
+            except Exception as e:
+                metrics.TWITTER_REQUESTS.inc(endpoint_key, "error")
+                logger.error(f"Twitter API request failed: {e}")
                 return None
-            
-            # Only process rate limits for authorized requests
-            if response.status_code == 200:
-                self.token_status[token_type]['rate_limit_remaining'] = int(response.headers.get('x-rate-limit-remaining', 0))
-                reset_time = int(response.headers.get('x-rate-limit-reset', 0))
-                self.token_status[token_type]['rate_limit_reset'] = datetime.datetime.fromtimestamp(reset_time)
-                
-                if self.token_status[token_type]['rate_limit_remaining'] <= self.rate_limit_warning_threshold:
-                    await self.notify_rate_limit_warning(token_type)
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:  # Rate limit exceeded
-                await self.handle_rate_limit_exceeded(token_type)
-            logger.error(f"Twitter API request failed: {e}")
-            return None
+            metrics.TWITTER_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint_key)
+            metrics.TWITTER_REQUESTS.inc(endpoint_key, str(response.status_code))
+
+            if response.status_code == 401:  # Unauthorized, try the next token
+                await self.handle_unauthorized_token(token)
+                continue
+
+            if response.status_code == 429:  # This token is cooling down, try the next one
+                self.tokens.mark_exhausted(token, endpoint, response.headers)
+                await self.handle_rate_limit_exceeded(token, endpoint)
+                continue
+
+            window = self.tokens.update(token, endpoint, response.headers)
+            if window['remaining'] is not None:
+                metrics.TWITTER_RATE_LIMIT_REMAINING.set(window['remaining'], token.name, endpoint_key)
+            if (response.status_code == 200 and window['remaining'] is not None
+                    and window['remaining'] <= self.rate_limit_warning_threshold
+                    and not window['warned']):
+                window['warned'] = True
+                await self.notify_rate_limit_warning(token, endpoint)
+
+            try:
+                response.raise_for_status()
+                return loads(response.content)
+            except Exception as e:
+                logger.error(f"Twitter API request failed: {e}")
+                return None
+
+    async def close(self):
+        """Stop monitoring and release pooled HTTP connections"""
+        await self.relay.stop()
+        if self.monitor_task and not self.monitor_task.done():
+            self.monitoring = False
+            self.monitor_task.cancel()
+            try:
+                await self.monitor_task
+            except asyncio.CancelledError:
+                pass
+            self.monitor_task = None
+        if self.digest_task:
+            self.digest_task.cancel()
+            self.digest_task = None
+        if self.coordinator:
+            await self.coordinator.stop()
+            self.coordinator = None
+        # Buffered digests go out while the delivery queue is still running
+        try:
+            await self.flush_digests(force=True)
         except Exception as e:
-            logger.error(f"Twitter API request failed: {e}")
-            return None
+            logger.error(f"Error flushing digests on shutdown: {e}")
+        await self.stop_checkpoint_writer()
+        await self.client.aclose()
+        logger.info("Twitter HTTP client closed")
 
-    async def handle_unauthorized_token(self, token_type: str):
+    async def handle_unauthorized_token(self, token: BearerToken):
         """Handle unauthorized token scenario with clear messaging"""
-        self.token_status[token_type]['authorized'] = False
-        
-        message = f"⚠️ {token_type.upper()} token unauthorized - switching to alternate token"
-        logger.error(f"Token {token_type.upper()} unauthorized")
-        
-        # Only notify if all tokens become unauthorized
-        if not any(status['authorized'] for status in self.token_status.values()):
+        token.authorized = False
+        logger.error(f"Token {token.name.upper()} unauthorized")
+
+        # Only notify if all tokens become unauthorized, the monitor loop stops itself
+        if not self.tokens.authorized:
             message = "🚫 All tokens unauthorized - monitoring stopped"
-            admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
+            admin_chat_ids = await self.user_queries.get_super_admin_chat_ids()
             for admin_chat_id in admin_chat_ids:
                 await self.send_to_telegram(chat_id=admin_chat_id, message=message)
-            await self.stop_monitoring()
-
-    async def handle_rate_limit_exceeded(self, token_type: str):
-        """Handle rate limit exceeded with clear messaging"""
-        reset_time = self.token_status[token_type]['rate_limit_reset']
-        if reset_time:
-            reset_in = (reset_time - datetime.datetime.now()).total_seconds() / 60
-            message = f"⚠️ {token_type.upper()} rate limit reached - reset in {reset_in:.0f}min"
-        else:
-            message = f"⚠️ {token_type.upper()} rate limit reached - switching tokens"
-        
-        admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
-        for admin_chat_id in admin_chat_ids:
-            await self.send_to_telegram(chat_id=admin_chat_id, message=message)
-        
-        # If both tokens are rate limited, pause monitoring
-        if (self.token_status['dy']['rate_limit_remaining'] == 0 and
-            self.token_status['dx']['rate_limit_remaining'] == 0):
-            await self.pause_monitoring_until_reset()
 
     async def handle_all_tokens_unauthorized(self):
         """Handle scenario where all tokens are unauthorized"""
@@ -297,54 +486,58 @@ class TwitterManager:
             "Please update the configuration with valid tokens."
         )
         
-        admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
+        admin_chat_ids = await self.user_queries.get_super_admin_chat_ids()
         if admin_chat_ids:
             for admin_chat_id in admin_chat_ids:
                 await self.send_to_telegram(chat_id=admin_chat_id, message=message)
         
         await self.stop_monitoring()
 
-    async def fetch_user_tweets(self, user: set, headers, since_id=None):
+    def fetch_profile(self, user: tuple) -> dict:
+        """Request params sized to the user's recent activity, asking only for used fields"""
+        # Headroom over the expected count so a normal burst fits in one page
+        expected = self.scheduler.expected_tweets(user) * 2
+        max_results = next(
+            (size for size in FETCH_PAGE_SIZES if size >= expected),
+            FETCH_PAGE_SIZES[-1]
+        )
+        return {
+            "max_results": max_results,
+            "tweet.fields": TWEET_FIELDS,
+            "exclude": "retweets"
+        }
+
+    async def fetch_user_tweets(self, user: set, since_id=None):
         """Fetch tweets for a user without sending to Telegram"""
         try:
             username, user_id = user
-            params = {
-                "max_results": 10,
-                "tweet.fields": "created_at,text,conversation_id,in_reply_to_user_id",
-                "exclude": "retweets"
-            }
+            params = self.fetch_profile(user)
             
             if since_id:
                 params["since_id"] = since_id
 
             endpoint = f"users/{user_id}/tweets"
-            response = await self.make_request(endpoint, params, headers)
-
+            response = await self.make_request(endpoint, params)
+            pages = []
             if response and 'data' in response:
-                all_tweets = []
-                for tweet_data in response['data']:
-                    tweet_dict = {
-                        'id': tweet_data['id'],
-                        'text': tweet_data['text'],
-                        'created_at': tweet_data['created_at'],
-                        'is_reply': tweet_data.get('in_reply_to_user_id') is not None
-                    }
-                    all_tweets.append(tweet_dict)
-
-                sorted_tweets = sorted(
-                    all_tweets,
-                    key=lambda x: x['created_at'],
-                    reverse=True
-                )
+                pages.append(response['data'])
 
-                if since_id:
-                    sorted_tweets = [
-                        tweet for tweet in sorted_tweets 
-                        if int(tweet['id']) > int(since_id)
-                    ]
+            # A full page may hide older new tweets, follow pagination back to since_id
+            for _ in range(MAX_FETCH_PAGES - 1):
+                if not since_id or not response or len(response.get('data', [])) < params["max_results"]:
+                    break
+                next_token = response.get('meta', {}).get('next_token')
+                if not next_token:
+                    break
+                response = await self.make_request(endpoint, {**params, "pagination_token": next_token})
+                if response and 'data' in response:
+                    pages.append(response['data'])
 
-                logger.info(f"Fetched {len(sorted_tweets)} tweets for @{username}")
-                return username, sorted_tweets
+            if pages:
+                # Pages are consecutive, so one filtered pass over all of them stays ordered
+                tweets = parse_tweets([tweet for page in pages for tweet in page], since_id)
+                logger.info(f"Fetched {len(tweets)} tweets for @{username}")
+                return username, tweets
 
             return username, None
 
@@ -352,31 +545,174 @@ class TwitterManager:
             logger.error(f"Error fetching tweets for @{username}: {e}")
             return None, None
 
-    async def notify_rate_limit_warning(self, token_type: str):
+    @staticmethod
+    def build_search_query(users: list) -> str:
+        """Build a multi-author recent search query for the given users"""
+        authors = " OR ".join(f"from:{user_id}" for _, user_id in users)
+        return f"({authors}) -is:retweet"
+
+    def chunk_search_users(self, users: list) -> list[list]:
+        """Split users into chunks whose search query fits the query-length limit"""
+        base_length = len(self.build_search_query([]))
+        chunks = []
+        chunk = []
+        length = base_length
+
+        for user in users:
+            term_length = len(f"from:{user[1]}") + (len(" OR ") if chunk else 0)
+            if chunk and length + term_length > self.search_query_limit:
+                chunks.append(chunk)
+                chunk = []
+                length = base_length
+                term_length = len(f"from:{user[1]}")
+            chunk.append(user)
+            length += term_length
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def search_since_id(self, users: list, checkpoints: dict = None) -> int | None:
+        """
+        since_id for a batched query: the oldest position any user in the chunk
+        was searched up to, clamped into recent search's 7 day window.
+        Explicit checkpoints (a replay) take the place of the stored ones and watermarks.
+        """
+        positions = []
+        for user in users:
+            if checkpoints is not None:
+                position = int(checkpoints[user]) if checkpoints.get(user) else 0
+            else:
+                checkpoint = int(self.last_tweets[user]) if self.last_tweets.get(user) else 0
+                position = max(checkpoint, self.search_watermarks.get(user, 0))
+            if position:
+                positions.append(position)
+        if not positions:
+            return None
+        floor = snowflake_at(datetime.datetime.now(datetime.timezone.utc) - SEARCH_WINDOW)
+        return max(min(positions), floor)
+
+    async def fetch_batched_tweets(self, users: list, checkpoints: dict = None) -> dict:
+        """
+        Fetch new tweets for many users with a single multi-author search query
+        Returns dict of user -> tweets (newest first) for users with new tweets.
+        A range that could not be paged back to since_id returns or raises
+        before anything advances, so the next cycle fetches it again.
+        """
+        since_id = self.search_since_id(users, checkpoints)
+        replay = checkpoints is not None
+        checkpoints = checkpoints if replay else self.last_tweets
+        params = {
+            "query": self.build_search_query(users),
+            "max_results": 100,
+            "tweet.fields": SEARCH_TWEET_FIELDS
+        }
+        if since_id:
+            params["since_id"] = str(since_id)
+
+        users_by_id = {user_id: (username, user_id) for username, user_id in users}
+        tweets_by_user = {}
+        newest_id = None
+
+        for page in range(MAX_FETCH_PAGES):
+            response = await self.make_request("tweets/search/recent", params)
+            if response is None and page:
+                # Tweets between the pages fetched so far and since_id would be skipped for good
+                raise RuntimeError(f"Search page {page + 1} failed for {len(users)} users, retrying the range")
+            if response is None:
+                # Failed request, keep the watermarks so the next cycle retries this range
+                return {}
+            if page == 0:
+                newest_id = response.get('meta', {}).get('newest_id')
+            if 'data' not in response:
+                break
+
+            for tweet in parse_tweets(response['data']):
+                user = users_by_id.get(tweet.author_id)
+                if user is None:
+                    continue
+
+                # Each account only advances past its own checkpoint
+                checkpoint = checkpoints.get(user)
+                if checkpoint and tweet.id <= int(checkpoint):
+                    continue
+
+                tweets_by_user.setdefault(user, []).append(tweet)
+
+            # Only page further back when bounded by a checkpoint and the page was full
+            next_token = response.get('meta', {}).get('next_token')
+            if not next_token or not since_id or len(response['data']) < params["max_results"]:
+                break
+            if page == MAX_FETCH_PAGES - 1:
+                logger.warning(f"Search burst for {len(users)} users exceeded {MAX_FETCH_PAGES} pages, older tweets skipped")
+                break
+            # Extra pages are paid from the same budget as polls
+            if not self.scheduler.take_budget(1):
+                logger.warning(f"Request budget exhausted while paging search for {len(users)} users, retrying the range")
+                return {}
+            params = {**params, "next_token": next_token}
+
+        # The query covered every author in the chunk up to newest_id, so quiet
+        # accounts stop holding the chunk's since_id back
+        if newest_id and not replay:
+            for user in users:
+                self.search_watermarks[user] = max(self.search_watermarks.get(user, 0), int(newest_id))
+
+        # Pages are fetched newest first, so each user's list is already ordered
+        for user, tweets in tweets_by_user.items():
+            logger.info(f"Fetched {len(tweets)} tweets for @{user[0]}")
+
+        return tweets_by_user
+
+    async def poll_batch(self, users: list, checkpoints: dict = None):
+        """Fetch and deliver new tweets for a chunk of users sharing one search query"""
+        tweets_by_user = {}
+        try:
+            async with self.poll_semaphore:
+                with metrics.ACCOUNT_FETCH_SECONDS.time("batch"):
+                    tweets_by_user = await self.fetch_batched_tweets(users, checkpoints)
+        finally:
+            for user in users:
+                self.scheduler.record(user, tweets_by_user.get(user))
+
+        for user in users:
+            tweets = tweets_by_user.get(user)
+            if not tweets:
+                continue
+            try:
+                self.set_checkpoint(user, tweets[0].id)
+                await self.deliver_tweets(user[0], tweets)
+            except Exception as e:
+                metrics.MONITOR_ERRORS.inc("deliver")
+                logger.error(f"Error delivering tweets for @{user[0]}: {e}")
+
+    async def notify_rate_limit_warning(self, token: BearerToken, endpoint: str):
         """Notify admins about approaching rate limit for authorized tokens"""
-        if not self.token_status[token_type]['authorized']:
+        if not token.authorized:
             return
-            
-        reset_time = self.token_status[token_type]['rate_limit_reset']
-        remaining = self.token_status[token_type]['rate_limit_remaining']
+
+        window = token.window(self.tokens.endpoint_key(endpoint))
+        reset_time = window['reset']
+        remaining = window['remaining']
         reset_in = (reset_time - datetime.datetime.now()).total_seconds() / 60
         
         message = (
-            f"⚠️ Rate Limit Warning for {token_type.upper()} token:\n"
+            f"⚠️ Rate Limit Warning for {token.name.upper()} token:\n"
+            f"Endpoint: {self.tokens.endpoint_key(endpoint)}\n"
             f"Remaining requests: {remaining}\n"
             f"Reset in: {reset_in:.1f} minutes\n"
             f"Reset time: {reset_time.strftime('%Y-%m-%d %H:%M:%S')}"
         )
         
-        admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
+        admin_chat_ids = await self.user_queries.get_super_admin_chat_ids()
         if admin_chat_ids:
             for admin_chat_id in admin_chat_ids:
                 await self.send_to_telegram(chat_id=admin_chat_id, message=message)
 
-    async def handle_rate_limit_exceeded(self, token_type: str):
+    async def handle_rate_limit_exceeded(self, token: BearerToken, endpoint: str):
         """Handle rate limit exceeded scenario"""
         try:
-            reset_time = self.token_status[token_type]['rate_limit_reset']
+            reset_time = token.window(self.tokens.endpoint_key(endpoint))['reset']
             # Check if reset_time is None before calculation
             if reset_time is None:
                 reset_in = 0
@@ -386,56 +722,46 @@ class TwitterManager:
                 reset_time_str = reset_time.strftime('%Y-%m-%d %H:%M:%S')
             
             message = (
-                f"🚫 Rate Limit Exceeded for {token_type.upper()} token!\n"
+                f"🚫 Rate Limit Exceeded for {token.name.upper()} token!\n"
+                f"Endpoint: {self.tokens.endpoint_key(endpoint)}\n"
                 f"Rate limit will reset in: {reset_in:.1f} minutes\n"
                 f"Reset time: {reset_time_str}"
             )
             
-            admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
+            admin_chat_ids = await self.user_queries.get_super_admin_chat_ids()
             if admin_chat_ids:
                 for admin_chat_id in admin_chat_ids:
                     await self.send_to_telegram(chat_id=admin_chat_id, message=message)
-            
-            # If both tokens are rate limited, pause monitoring temporarily
-            if (self.token_status['dy']['rate_limit_remaining'] == 0 and
-                self.token_status['dx']['rate_limit_remaining'] == 0):
-                await self.pause_monitoring_until_reset()
                 
         except Exception as e:
             logger.error(f"Error in handle_rate_limit_exceeded: {e}")
             # Fallback message in case of error
-            message = f"🚫 Rate Limit Exceeded for {token_type.upper()} token! Unable to determine reset time."
-            admin_chat_ids = self.account_queries.get_admin_chat_ids()
+            message = f"🚫 Rate Limit Exceeded for {token.name.upper()} token! Unable to determine reset time."
+            admin_chat_ids = await self.user_queries.get_admin_chat_ids()
             if admin_chat_ids:
                 for admin_chat_id in admin_chat_ids:
                     await self.send_to_telegram(chat_id=admin_chat_id, message=message)
 
-    async def pause_monitoring_until_reset(self):
-        """Temporarily pause monitoring until rate limits reset"""
+    async def pause_monitoring_until_reset(self, endpoint: str):
+        """Temporarily pause monitoring until the earliest token resets on an endpoint"""
+        admin_chat_ids = []
         try:
-            message = "⏸️ Monitoring temporarily paused due to rate limits on both tokens"
+            message = "⏸️ Monitoring temporarily paused due to rate limits on all tokens"
             
-            admin_chat_ids = self.account_queries.get_super_admin_chat_ids()
+            admin_chat_ids = await self.user_queries.get_super_admin_chat_ids()
             if admin_chat_ids:
                 for admin_chat_id in admin_chat_ids:
                     await self.send_to_telegram(chat_id=admin_chat_id, message=message)
             
-            # Calculate shortest reset time, handling None values
-            dy_reset = self.token_status['dy']['rate_limit_reset']
-            dx_reset = self.token_status['dx']['rate_limit_reset']
-            
-            if dy_reset is None and dx_reset is None:
-                wait_time = 900  # 15 minutes default wait if both reset times are None
-            elif dy_reset is None:
-                wait_time = (dx_reset - datetime.datetime.now()).total_seconds()
-            elif dx_reset is None:
-                wait_time = (dy_reset - datetime.datetime.now()).total_seconds()
+            # Calculate shortest reset time, handling unknown resets
+            reset_time = self.tokens.next_reset(endpoint)
+            if reset_time is None:
+                wait_time = 900  # 15 minutes default wait if no reset time is known
             else:
-                reset_time = min(dy_reset, dx_reset)
                 wait_time = (reset_time - datetime.datetime.now()).total_seconds()
             
             # Ensure wait_time is positive and reasonable
-            wait_time = max(min(wait_time, 3600), 300)  # Between 5 minutes and 1 hour
+            wait_time = max(min(wait_time, 3600), 0)  # At most 1 hour
             
             await asyncio.sleep(wait_time + 5)  # Add 5 seconds buffer
             
@@ -453,75 +779,309 @@ class TwitterManager:
                 for admin_chat_id in admin_chat_ids:
                     await self.send_to_telegram(chat_id=admin_chat_id, message=message)
 
+    def set_checkpoint(self, user: tuple, since_id):
+        """Advance a user's since_id and queue it for the write-behind checkpoint store"""
+        current = self.last_tweets.get(user)
+        if current and int(current) >= int(since_id):
+            # A replay can finish after the stream already delivered newer tweets
+            return
+        self.last_tweets[user] = str(since_id)
+        self.pending_checkpoints[user[1]] = str(since_id)
+
+    async def load_checkpoints(self, users: list[set]):
+        """Resume since_ids from the checkpoint store for the given users"""
+        checkpoints = await self.account_queries.get_checkpoints([user[1] for user in users])
+        for user in users:
+            since_id = checkpoints.get(user[1])
+            if since_id:
+                self.last_tweets[user] = since_id
+
+    async def flush_checkpoints(self):
+        """Write all pending checkpoints to the database in a single commit"""
+        if not self.pending_checkpoints:
+            return
+
+        pending, self.pending_checkpoints = self.pending_checkpoints, {}
+        try:
+            await self.account_queries.save_checkpoints(pending)
+        except Exception as e:
+            logger.error(f"Error saving checkpoints: {e}")
+            # Keep newer values recorded while the write was failing
+            self.pending_checkpoints = {**pending, **self.pending_checkpoints}
+
+    async def checkpoint_loop(self):
+        """Periodically flush pending checkpoints and deliveries outside the poll loop"""
+        while True:
+            await asyncio.sleep(self.checkpoint_flush_interval)
+            await self.flush_checkpoints()
+            await self.dedup.flush()
+
+    async def stop_checkpoint_writer(self):
+        """Stop the checkpoint writer and flush anything still pending"""
+        if self.checkpoint_task:
+            self.checkpoint_task.cancel()
+            try:
+                await self.checkpoint_task
+            except asyncio.CancelledError:
+                pass
+            self.checkpoint_task = None
+        await self.flush_checkpoints()
+        await self.dedup.flush()
+
     async def initialize_monitoring(self, users: list[set]):
         """Initialize monitoring for new users with latest tweet/reply IDs"""
-        admin_chat_ids = self.account_queries.get_admin_chat_ids()
-        initialization_messages = []
+        async def initialize(user):
+            async with self.poll_semaphore:
+                latest_id = await self.fetch_latest_activity(user)
 
-        for user in users:
-            if user not in self.last_tweets:
-                latest_id = await self.fetch_latest_activity(user, self.headers_dy)
-                
-                if latest_id:
-                    self.last_tweets[user] = str(latest_id)
-                    msg = f"✅ Initialized monitoring for @{user[0]} - Latest activity ID: {latest_id}"
-                else:
-                    msg = f"⚠️ Could not fetch initial tweets for @{user[0]}"
-                
-                initialization_messages.append(msg)
-                logger.info(msg)
+            if latest_id:
+                self.set_checkpoint(user, latest_id)
+                logger.info(f"✅ Initialized monitoring for @{user[0]} - Latest activity ID: {latest_id}")
+            else:
+                logger.info(f"⚠️ Could not fetch initial tweets for @{user[0]}")
+
+        await asyncio.gather(*(
+            initialize(user) for user in users if user not in self.last_tweets
+        ))
+
+    async def deliver_tweets(self, username: str, tweets: list):
+        """Send new tweets (newest first) to all admins in chronological order"""
+        tweets = self.dedup.claim(tweets)
+        if not tweets:
+            return
+        metrics.TWEETS_DELIVERED.inc(amount=len(tweets))
+
+        if self.digest_mode:
+            # Coalesce into the account's digest, flushed by flush_digests
+            self.digest_buffer.setdefault(username, []).extend(reversed(tweets))
+            self.digest_started.setdefault(username, time.monotonic())
+            return
+
+        chat_ids = await self.user_queries.get_admin_chat_ids()
+        for message, keyboard in self.formatter.format_batch(username, list(reversed(tweets))):
+            for chat_id in chat_ids:
+                await self.send_to_telegram(
+                    chat_id=chat_id,
+                    message=message,
+                    reply_markup=keyboard
+                )
+
+    def format_digest_messages(self, username: str, tweets: list) -> tuple[list[str], InlineKeyboardMarkup]:
+        """
+        Merge tweets (oldest first) into digest messages under Telegram's length limit
+        Returns tuple of (messages, profile keyboard)
+        """
+        separator = "\n\n— — —\n\n"
+        entries = [self.formatter.format_digest_entry(username, tweet) for tweet in tweets]
+
+        header = self.formatter.digest_header(username, len(tweets))
+        messages = []
+        current = header
+        for entry in entries:
+            candidate = entry if current == header else separator + entry
+            if len(current) + len(candidate) > TELEGRAM_MESSAGE_LIMIT and current != header:
+                messages.append(current)
+                current = header
+                candidate = entry
+            # Entries are bounded by shorten_text, so one always fits on its own
+            current += candidate
+        messages.append(current)
+
+        return messages, self.formatter.template(username).profile_keyboard
+
+    async def flush_digests(self, force: bool = False):
+        """Send every buffered digest whose coalescing window has elapsed"""
+        if not self.digest_buffer:
+            return
+
+        now = time.monotonic()
+        ready = [
+            username for username, started in self.digest_started.items()
+            if force or now - started >= self.digest_window
+        ]
+        if not ready:
+            return
+
+        chat_ids = await self.user_queries.get_admin_chat_ids()
+        for username in ready:
+            tweets = self.digest_buffer.pop(username, [])
+            self.digest_started.pop(username, None)
+            if not tweets:
+                continue
+
+            messages, keyboard = self.format_digest_messages(username, tweets)
+            for message in messages:
+                for chat_id in chat_ids:
+                    await self.send_to_telegram(
+                        chat_id=chat_id,
+                        message=message,
+                        reply_markup=keyboard
+                    )
+
+    async def poll_user(self, user: tuple, since_id=None):
+        """Fetch and deliver new tweets for a single monitored user, from its checkpoint by default"""
+        tweets = None
+        try:
+            async with self.poll_semaphore:
+                with metrics.ACCOUNT_FETCH_SECONDS.time("user"):
+                    username, tweets = await self.fetch_user_tweets(
+                        user,
+                        since_id or self.last_tweets.get(user)
+                    )
+        finally:
+            self.scheduler.record(user, tweets)
+
+        if tweets:
+            self.set_checkpoint(user, tweets[0].id)
+            await self.deliver_tweets(username, tweets)
 
     async def monitor_loop(self):
-        """Improved monitor loop with token switching and centralized message sending"""
+        """Monitor loop polling due users concurrently within the request budget"""
         while self.monitoring:
             try:
-                current_headers = self.get_current_headers()
-                if not current_headers:
+                if not self.tokens.authorized:
                     logger.error("No authorized tokens available")
                     await self.handle_all_tokens_unauthorized()
                     break
-                
-                for user in self.monitored_users:
-                    username, tweets = await self.fetch_user_tweets(
-                        user,
-                        current_headers,
-                        self.last_tweets.get(user)
+
+                # Only pause when every token is cooling down on the polling endpoint
+                endpoint = "tweets/search/recent" if self.batch_mode else "users/:id/tweets"
+                if self.tokens.select(endpoint) is None:
+                    await self.pause_monitoring_until_reset(endpoint)
+                    continue
+                # Throughput follows the tokens that can serve requests right now
+                self.scheduler.set_budget(self.request_budget * self.tokens.usable(endpoint))
+
+                cycle_started = time.perf_counter()
+                users = self.scheduler.pop_due()
+                if self.batch_mode:
+                    chunks = self.chunk_search_users(users)
+                    granted = self.scheduler.take_budget(len(chunks))
+                    for chunk in chunks[granted:]:
+                        for user in chunk:
+                            self.scheduler.defer(user)
+                    chunks = chunks[:granted]
+
+                    results = await asyncio.gather(
+                        *(self.poll_batch(chunk) for chunk in chunks),
+                        return_exceptions=True
                     )
-                    
-                    if tweets and len(tweets) > 0:
-                        self.last_tweets[user] = tweets[0]['id']
-                        # Send tweets to Telegram here
-                        chat_ids = self.user_queries.get_admin_chat_ids()
-                        for tweet in reversed(tweets):
-                            if tweet['is_reply']:
-                                message, keyboard = self.format_reply_message(username, tweet)
-                            else:
-                                message, keyboard = self.format_tweet_message(username, tweet)
-                            
-                            for chat_id in chat_ids:
-                                await self.send_to_telegram(
-                                    chat_id=chat_id,
-                                    message=message,
-                                    reply_markup=keyboard
-                                )
-                
-                await asyncio.sleep(self.poll_interval)
+                    for chunk, result in zip(chunks, results):
+                        if isinstance(result, Exception):
+                            metrics.MONITOR_ERRORS.inc("poll")
+                            logger.error(f"Error polling batch of {len(chunk)} users: {result}")
+                else:
+                    granted = self.scheduler.take_budget(len(users))
+                    for user in users[granted:]:
+                        self.scheduler.defer(user)
+                    users = users[:granted]
+
+                    results = await asyncio.gather(
+                        *(self.poll_user(user) for user in users),
+                        return_exceptions=True
+                    )
+
+                    # Failures stay isolated to the account that raised them
+                    for user, result in zip(users, results):
+                        if isinstance(result, Exception):
+                            metrics.MONITOR_ERRORS.inc("poll")
+                            logger.error(f"Error polling @{user[0]}: {result}")
+
+                # Idle wake-ups would drown out the duration of real cycles
+                if users:
+                    metrics.MONITOR_CYCLE_SECONDS.observe(time.perf_counter() - cycle_started)
+                self.last_cycle_at = time.monotonic()
+
+                await asyncio.sleep(self.scheduler.next_delay())
             
             except Exception as e:
+                metrics.MONITOR_ERRORS.inc("loop")
                 logger.error(f"Error in monitor loop: {e}")
                 await asyncio.sleep(self.poll_interval)    
 
-    async def monitor(self, users: list[set]):
+    async def handle_pushed_tweet(self, user: tuple, tweet: Tweet):
+        """Deliver a tweet pushed by the stream or a webhook through the polling path"""
+        since_id = self.last_tweets.get(user)
+        if (since_id and tweet.id <= int(since_id)) or tweet.id in self.dedup:
+            return
+
+        self.set_checkpoint(user, tweet.id)
+        self.scheduler.record_latencies([tweet])
+        await self.deliver_tweets(user[0], [tweet])
+
+    async def replay_missed(self, checkpoints: dict):
+        """
+        Poll users once from the checkpoints they had when the stream dropped.
+        Requests are paid from the scheduler budget, waiting for it to refill.
+        """
+        users = list(checkpoints)
+        if self.batch_mode:
+            units = [
+                lambda chunk=chunk: self.poll_batch(chunk, checkpoints)
+                for chunk in self.chunk_search_users(users)
+            ]
+        else:
+            units = [lambda user=user: self.poll_user(user, checkpoints[user]) for user in users]
+
+        failures = []
+        while units and self.monitoring:
+            granted = self.scheduler.take_budget(len(units))
+            if not granted:
+                await asyncio.sleep(1 / max(self.scheduler.budget_rate, 1e-6))
+                continue
+            batch, units = units[:granted], units[granted:]
+            results = await asyncio.gather(*(unit() for unit in batch), return_exceptions=True)
+            failures += [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.error(f"Replay after reconnect failed for {len(failures)} requests: {failures[0]}")
+
+    def mark_push_subscribed(self, user: tuple):
+        """Stop polling a user whose tweets now arrive through the webhook"""
+        if user not in self.push_users:
+            self.push_users.add(user)
+            self.scheduler.remove(user)
+            if self.coordinator:
+                self.coordinator.remove_user(user, forget=forget_checkpoint)
+            logger.info(f"@{user[0]} is push subscribed, polling disabled")
+
+    async def sync_stream_rules(self, users: list):
+        """Update filtered stream rules after the monitored account list changes"""
+        if self.ingestion_mode == "stream":
+            await self.stream.sync_rules(users)
+
+    async def digest_loop(self):
+        """Flush each digest when its coalescing window ends, independent of the poll schedule"""
+        while self.monitoring:
+            delay = self.digest_window
+            if self.digest_started:
+                delay = min(self.digest_started.values()) + self.digest_window - time.monotonic()
+            await asyncio.sleep(min(max(delay, 0.5), max(self.digest_window, 1)))
+            try:
+                await self.flush_digests()
+            except Exception as e:
+                metrics.MONITOR_ERRORS.inc("digest")
+                logger.error(f"Error flushing digests: {e}")
+
+    @property
+    def sharded(self) -> bool:
+        """Whether polling runs in shard processes instead of this one"""
+        return self.shard_count > 1 and self.ingestion_mode == "poll"
+
+    async def monitor(self, users: list[set], push_users: list[set] = None, notify: bool = True):
         """Start monitoring tweets from the given usernames"""
-        if self.monitor_task and not self.monitor_task.done():
+        if self.monitoring or (self.monitor_task and not self.monitor_task.done()):
             return
         
         self.monitoring = True
-        self.monitored_users = users
+        self.registry = {user[1]: user for user in users}
+        self.scheduler.reset(users)
+        self.push_users = set()
+        for user in push_users or []:
+            self.mark_push_subscribed(user)
         logger.info(f"Started monitoring: {', '.join([user[0] for user in users])}")
         
         # Send startup notification
-        admin_chat_ids = self.account_queries.get_admin_chat_ids()
+        admin_chat_ids = await self.user_queries.get_admin_chat_ids() if notify else []
         if admin_chat_ids:
             for admin_chat_id in admin_chat_ids:
                 await self.send_to_telegram(
@@ -529,7 +1089,14 @@ class TwitterManager:
                     message=f"🔔 Starting tweet monitoring process..."
                 )
         
-        # Initialize with latest tweets
+        if self.sharded:
+            await self.start_shards(users, admin_chat_ids)
+            return
+
+        # Resume stored checkpoints and deliveries, then initialize only users without one
+        await self.load_checkpoints(users)
+        if not self.dedup.ids:
+            await self.dedup.load()
         await self.initialize_monitoring(users)
         
         # Send confirmation of initialization
@@ -546,12 +1113,109 @@ class TwitterManager:
                     message=status_message
                 )
         
-        # Start the monitoring loop
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
+        # Start the monitoring loop (or stream consumer) and checkpoint writer
+        if self.ingestion_mode == "stream":
+            await self.stream.sync_rules(users)
+            self.monitor_task = asyncio.create_task(self.stream.run())
+        else:
+            self.monitor_task = asyncio.create_task(self.monitor_loop())
+        if self.digest_mode and not self.digest_task:
+            self.digest_task = asyncio.create_task(self.digest_loop())
+        if not self.checkpoint_task:
+            self.checkpoint_task = asyncio.create_task(self.checkpoint_loop())
+
+    async def start_shards(self, users: list[set], admin_chat_ids: list):
+        """Hand polled users to shard processes, each loads its own checkpoints"""
+        tokens = [(token.name, token.bearer) for token in self.tokens.tokens]
+        self.coordinator = ShardCoordinator(self.config, tokens, self.shard_count)
+        await self.coordinator.start([user for user in users if user not in self.push_users])
+        self.monitor_task = asyncio.create_task(self.coordinator.watch())
 
-    async def stop_monitoring(self):
+        for admin_chat_id in admin_chat_ids:
+            await self.send_to_telegram(
+                chat_id=admin_chat_id,
+                message=(
+                    "📊 Monitoring Status:\n"
+                    f"Users being monitored: {', '.join([f'@{user[0]}' for user in users])}\n"
+                    f"Poll interval: {self.poll_interval} seconds\n"
+                    f"Split across {self.shard_count} monitor processes"
+                )
+            )
+
+    def stats(self) -> dict:
+        """
+        Performance snapshot from in-memory counters, never touches the database.
+        In sharded mode it includes the metrics last reported by every shard.
+        """
+        combined = metrics.REGISTRY.combined
+        cycles = combined(metrics.MONITOR_CYCLE_SECONDS)
+        latency = combined(metrics.DETECTION_LATENCY_SECONDS)
+        requests = combined(metrics.TWITTER_REQUESTS)
+        messages = combined(metrics.TELEGRAM_MESSAGES)
+        return {
+            "monitoring": self.monitoring,
+            "accounts": len(self.registry),
+            "push_accounts": len(self.push_users),
+            "shards": len(self.coordinator.processes) if self.coordinator else 0,
+            "last_cycle": cycles.last(),
+            "latency_p50": latency.percentile(0.5),
+            "latency_p95": latency.percentile(0.95),
+            "tokens": self.token_status,
+            "pending_messages": combined(metrics.TELEGRAM_QUEUE_DEPTH).total(),
+            "errors": {
+                "monitor": combined(metrics.MONITOR_ERRORS).total(),
+                "twitter_failed": requests.total() - sum(
+                    value for (_, status), value in requests.values.items()
+                    if status.startswith("2")
+                ),
+                "telegram_failed": messages.get("error") + messages.get("dropped")
+            },
+            "duplicates": combined(metrics.DUPLICATE_TWEETS).total()
+        }
+
+    def health(self) -> dict:
+        """Liveness of the monitor in this process, healthy when it is not supposed to run"""
+        task_alive = self.monitor_task is not None and not self.monitor_task.done()
+        cycle_age = time.monotonic() - self.last_cycle_at if self.last_cycle_at else None
+        status = {
+            "leader": self.is_leader,
+            "monitoring": self.monitoring,
+            "monitor_task_alive": task_alive,
+            "accounts": len(self.registry),
+            "last_cycle_age": round(cycle_age, 1) if cycle_age is not None else None,
+            "pending_messages": self.delivery.pending
+        }
+        healthy = not self.monitoring or task_alive
+        if self.coordinator:
+            alive = sum(process.is_alive() for process in self.coordinator.processes.values())
+            status["shards_alive"] = alive
+            healthy = healthy and alive > 0
+        elif self.ingestion_mode == "stream":
+            status["stream_connected"] = self.stream.connected
+        elif self.monitoring and cycle_age is not None:
+            # A loop that stopped cycling is as dead as a finished task, allowing
+            # for a full 15 minute rate-limit pause
+            healthy = healthy and cycle_age < max(self.scheduler.max_interval * 3, 960)
+        status["status"] = "ok" if healthy else "unhealthy"
+        return status
+
+    async def start_from_database(self):
+        """Start monitoring every account stored in the database"""
+        accounts = await self.account_queries.get_all_accounts()
+        users = [(account.twitter_username, account.twitter_id) for account in accounts]
+        # accounts already delivered by the Account Activity webhook
+        push_users = [
+            (account.twitter_username, account.twitter_id)
+            for account in accounts if account.webhook_id
+        ]
+        await self.monitor(users, push_users)
+
+    async def stop_monitoring(self, notify: bool = True):
         """Stop monitoring tweets"""
         self.monitoring = False
+        if self.monitor_task and self.monitor_task is asyncio.current_task():
+            # Called from inside the loop, it exits on its own
+            self.monitor_task = None
         if self.monitor_task:
             self.monitor_task.cancel()
             try:
@@ -559,10 +1223,18 @@ class TwitterManager:
             except asyncio.CancelledError:
                 logger.info("Monitoring task cancelled.")
             self.monitor_task = None
+        if self.digest_task:
+            self.digest_task.cancel()
+            self.digest_task = None
+        if self.coordinator:
+            await self.coordinator.stop()
+            self.coordinator = None
+        await self.flush_digests(force=True)
+        await self.stop_checkpoint_writer()
         
         logger.info("Stopped monitoring.")
         
-        admin_chat_ids = self.account_queries.get_admin_chat_ids()
+        admin_chat_ids = await self.user_queries.get_admin_chat_ids() if notify else []
         if admin_chat_ids:
             for admin_chat_id in admin_chat_ids:
                 await self.send_to_telegram(
@@ -571,32 +1243,115 @@ class TwitterManager:
                 )
 
     async def add_monitored_user(self, user: set):
-        """Add a new user to the monitored list"""
-        if user not in self.monitored_users:
-            self.monitored_users.append(user)
-            await self.initialize_monitoring([user])
-            logger.info(f"Added @{user[0]} to the monitored list.")
-
-    async def remove_monitored_user(self, user: set):
-        """Remove a user from the monitored list"""
-        if user in self.monitored_users:
-            self.monitored_users.remove(user)
+        """Add a user to the running monitor, initializing only that user"""
+        await self.add_monitored_users([user])
+
+    async def add_monitored_users(self, users: list[set]):
+        """Add users to the running monitor, syncing stream rules and rebalancing once"""
+        users = [user for user in dict.fromkeys(users) if user[1] not in self.registry]
+        if not users:
+            return
+
+        for user in users:
+            self.registry[user[1]] = user
+        await self.sync_stream_rules(self.monitored_users)
+        if self.coordinator:
+            self.coordinator.add_users(users)
+        else:
+            for user in users:
+                self.scheduler.add(user)
+            # A user moved from another shard resumes from its checkpoint
+            await self.load_checkpoints(users)
+            await self.initialize_monitoring(users)
+        logger.info(f"Added {', '.join('@' + user[0] for user in users)} to the monitored list.")
+
+    async def remove_monitored_user(self, user: set, forget_checkpoint: bool = True):
+        """Remove a user from the running monitor"""
+        if user[1] in self.registry:
+            # State is keyed by the registered tuple, the username may have changed
+            user = self.registry.pop(user[1])
+            await self.sync_stream_rules(self.monitored_users)
+            self.scheduler.remove(user)
+            self.push_users.discard(user)
+            if self.coordinator:
+                self.coordinator.remove_user(user)
             if user in self.last_tweets:
                 del self.last_tweets[user]
+            self.search_watermarks.pop(user, None)
+            self.formatter.forget(user[0])
+            if forget_checkpoint:
+                self.pending_checkpoints.pop(user[1], None)
+                await self.account_queries.delete_checkpoint(user[1])
+            else:
+                # Handing the user to another shard, persist where this one stopped
+                await self.flush_checkpoints()
             logger.info(f"Removed @{user[0]} from the monitored list.")
         else:
             logger.info(f"@{user[0]} is not in the monitored list.")
+
+    async def users_added(self, users: list):
+        """Hand accounts just stored in the database to the leader's monitor"""
+        if users:
+            await self.relay.send('add_users', {'users': [list(user) for user in users]})
+
+    async def user_removed(self, user: set):
+        """Hand an account just deleted from the database to the leader's monitor"""
+        await self.relay.send('remove_user', {'user': list(user)})
+
+    async def on_users_added(self, payload: dict):
+        if self.monitoring:
+            await self.add_monitored_users([tuple(user) for user in payload['users']])
+
+    async def on_user_removed(self, payload: dict):
+        if self.monitoring:
+            await self.remove_monitored_user(tuple(payload['user']))
+
+    async def request_monitoring(self, enabled: bool):
+        """Start or stop the leader's monitor and remember it for the next leader"""
+        await self.account_queries.set_setting('monitoring', '1' if enabled else '0')
+        await self.relay.send('set_monitoring', {'enabled': enabled})
+
+    async def monitoring_requested(self) -> bool:
+        """Whether monitoring was last started with /start_monitoring"""
+        return await self.account_queries.get_setting('monitoring') == '1'
+
+    async def on_set_monitoring(self, payload: dict):
+        # Run in the background, starting initializes every account first
+        if payload['enabled'] and not self.monitoring:
+            asyncio.create_task(self.start_from_database())
+        elif not payload['enabled'] and self.monitoring:
+            asyncio.create_task(self.stop_monitoring())
+
+    async def on_roles_changed(self, payload: dict):
+        self.user_queries.invalidate_recipient_cache()
             
     async def get_user_id(self, username: str):
-        """Get user information from username"""
+        """Get a user's ID from their username, served from the resolution cache when possible"""
+        user = await self.resolver.resolve(username)
+        if user:
+            logger.info(f"User ID for @{username}: {user[1]}")
+            return user[1]
+        return None
+
+    async def lookup_usernames(self, usernames: list[str]) -> dict | None:
+        """Look up to 100 usernames in one users/by request, None when the request fails"""
         params = {
-            "usernames": username,
+            "usernames": ",".join(usernames),
             "user.fields": "id,username"
         }
-        response = await self.make_request("users/by", params, self.headers_dy)
-        
-        if response and 'data' in response:
-            user_data = response['data'][0]
-            logger.info(f"User ID for @{username}: {user_data['id']}")
-            return user_data['id']
-        return None
\ No newline at end of file
+        response = await self.make_request("users/by", params)
+        if not response:
+            logger.warning(f"Could not resolve a batch of {len(usernames)} usernames")
+            return None
+
+        # Unknown or suspended usernames come back under "errors"
+        return {
+            user_data['username'].lower(): (user_data['username'], user_data['id'])
+            for user_data in response.get('data', [])
+        }
+
+    async def get_user_ids(self, usernames: list[str]) -> dict:
+        """Resolve usernames to (username, twitter_id) in batches of 100 per users/by request"""
+        resolved = await self.resolver.resolve_many(usernames)
+        logger.info(f"Resolved {len(resolved)} of {len(usernames)} usernames")
+        return resolved
@@ -6,15 +6,25 @@
 from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
+import io
+import re
+import csv
+import tempfile
 import logging
-import asyncio
 logger = logging.getLogger(__name__)
 
+# Twitter usernames are 1-15 letters, digits or underscores
+USERNAME_PATTERN = re.compile(r'^[A-Za-z0-9_]{1,15}$')
+# Keep summary replies under Telegram's 4096 character limit
+REPLY_CHUNK_SIZE = 4000
+# Exports larger than this are written to a temporary file instead of memory
+EXPORT_SPOOL_SIZE = 1024 * 1024
+
 def admin_only(func):
 	"""Decorator to restrict commands to admin users only"""
 	@wraps(func)
 	async def wrapped(self, update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-		user = self.user_queries.get_user(str(update.effective_user.id))
+		user = await self.user_queries.get_user(str(update.effective_user.id))
 		if not user or user.role not in ['admin', 'super_admin']:
 			await update.message.reply_text("This command is restricted to administrators.")
 			return
@@ -24,20 +34,24 @@ def admin_only(func):
 class Commands:
 
     def __init__(self, app, user_queries, account_queries, twitter_monitor):
-        self.is_monitoring = False
         self.app = app
         self.user_queries = user_queries
         self.account_queries = account_queries
         # self.twitter_api = twitter_api
         self.twitter_monitor = twitter_monitor
 
+    @property
+    def is_monitoring(self):
+        """Whether the Twitter monitor in this process is running"""
+        return self.twitter_monitor.monitoring
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle the /start command"""
         try:
             logger.info(f"Start command received from user {update.effective_user.id}")
             user = update.effective_user
-            if not self.user_queries.get_user(user.id):
-                self.user_queries.create_user(user.id, user.username, "pending")
+            if not await self.user_queries.get_user(user.id):
+                await self.user_queries.create_user(user.id, user.username, "pending")
                 await update.message.reply_text(
                     "Welcome! Please request access using /request_access"
                 )
@@ -59,7 +73,7 @@ class Commands:
         try:
             logger.info(f"Request access command received from user {update.effective_user.id}")
             user_id = update.effective_user.id
-            if self.user_queries.create_access_request(user_id):
+            if await self.user_queries.create_access_request(user_id):
                 await update.message.reply_text(
 					"Access request submitted. An admin will review it."
 				)
@@ -88,13 +102,12 @@ class Commands:
                 return
 
             user_id = args[0]
-            user = self.user_queries.get_user(user_id)
+            user = await self.user_queries.get_user(user_id)
             if not user:
                 await update.message.reply_text("User not found.")
                 return
 
-            user.role = 'user'
-            self.user_queries.session.commit()
+            await self.user_queries.set_user_role(user_id, 'user')
             await update.message.reply_text(f"User {user_id} has been approved.")
             await self._send_message(user_id, "Your access request has been approved.")
             logger.info(f"User {user_id} approved")
@@ -107,7 +120,7 @@ class Commands:
     async def notify_admins(self, message: str):
         """Notify all admins with a message"""
         # Notify admins
-        admin_ids = self.account_queries.get_admin_ids()
+        admin_ids = await self.user_queries.get_admin_chat_ids()
         for admin_id in admin_ids:
             await self._send_message(admin_id, message)
 
@@ -126,13 +139,12 @@ class Commands:
                 return
 
             user_id = args[0]
-            user = self.user_queries.get_user(user_id)
+            user = await self.user_queries.get_user(user_id)
             if not user:
                 await update.message.reply_text("User not found.")
                 return
 
-            self.user_queries.session.delete(user)
-            self.user_queries.session.commit()
+            await self.user_queries.delete_user(user_id)
             await update.message.reply_text(f"User {user_id} has been denied.")
             await self._send_message(user_id, "Your access request has been denied.")
             logger.info(f"User {user_id} denied")
@@ -153,13 +165,12 @@ class Commands:
                 return
 
             user_id = args[0]
-            user = self.user_queries.get_user(user_id)
+            user = await self.user_queries.get_user(user_id)
             if not user:
                 await update.message.reply_text("User not found.")
                 return
 
-            user.role = 'admin'
-            self.user_queries.session.commit()
+            await self.user_queries.set_user_role(user_id, 'admin')
             await update.message.reply_text(f"User {user_id} has been promoted to admin.")
             await self._send_message(user_id, "You have been promoted to admin.")
             logger.info(f"User {user_id} promoted to admin")
@@ -180,13 +191,12 @@ class Commands:
                 return
 
             user_id = args[0]
-            user = self.user_queries.get_user(user_id)
+            user = await self.user_queries.get_user(user_id)
             if not user:
                 await update.message.reply_text("User not found.")
                 return
 
-            user.role = 'user'
-            self.user_queries.session.commit()
+            await self.user_queries.set_user_role(user_id, 'user')
             await update.message.reply_text(f"User {user_id} has been revoked from admin.")
             await self._send_message(user_id, "You have been revoked from admin.")
             logger.info(f"Admin rights revoked from user {user_id}")
@@ -257,7 +267,7 @@ class Commands:
                 return
 
             # Check if an account already exists
-            existing_account = self.account_queries.get_account_by_username(username)
+            existing_account = await self.account_queries.get_account_by_username(username)
             if existing_account:
                 await update.message.reply_text(
 					f"Account @{username} is already being monitored."
@@ -265,23 +275,20 @@ class Commands:
                 return
 
             # Add an account to a database
-            account = self.account_queries.add_account(
+            account = await self.account_queries.add_account(
 				username=username,
 				twitter_id=twitter_id,
 				added_by=update.effective_user.id
 			)
 
             if account:
-                self.account_queries.session.commit()
-
+                # Start polling the new account without restarting the monitor
+                await self.twitter_monitor.users_added([(username, twitter_id)])
                 await update.message.reply_text(
 					f"Successfully added @{username} to monitored accounts."
 				)
                 logger.info(f"Account @{username} added successfully by {update.effective_user.id}")
             else:
-                # Rollback account creation if the webhook subscription fails
-                self.account_queries.session.delete(account)
-                self.account_queries.session.commit()
                 await update.message.reply_text(
 					f"Failed to subscribe to @{username}'s tweets. Please try again."
 				)
@@ -306,7 +313,7 @@ class Commands:
                 return
 
             username = context.args[0].strip('@')
-            account = self.account_queries.get_account_by_username(username)
+            account = await self.account_queries.get_account_by_username(username)
 
             if not account:
                 await update.message.reply_text(
@@ -315,8 +322,10 @@ class Commands:
                 return
 
             # Remove from database
-            self.account_queries.session.delete(account)
-            self.account_queries.session.commit()
+            await self.account_queries.delete_account(account.id)
+            await self.twitter_monitor.user_removed(
+				(account.twitter_username, account.twitter_id)
+			)
 
             await update.message.reply_text(
 				f"Successfully removed @{username} from monitored accounts."
@@ -335,7 +344,7 @@ class Commands:
         try:
             logger.info(f"List accounts command received from user {update.effective_user.id}")
 
-            accounts = self.account_queries.get_all_accounts()
+            accounts = await self.account_queries.get_all_accounts()
 
             if not accounts:
                 await update.message.reply_text("No accounts are currently being monitored.")
@@ -356,13 +365,154 @@ class Commands:
 				"Sorry, there was an error listing the accounts. Please try again."
 			)
 
+    async def _read_import_usernames(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> list[str]:
+        """Collect usernames from the command arguments or an attached/replied-to file"""
+        message = update.message
+        document = message.document
+        if not document and message.reply_to_message:
+            document = message.reply_to_message.document
+
+        names = re.split(r'[\s,;]+', " ".join(context.args or []))
+        if document:
+            telegram_file = await document.get_file()
+            content = await telegram_file.download_as_bytearray()
+            # One username per line, CSV files (like /export_accounts) use the first column
+            for line in content.decode('utf-8', errors='ignore').splitlines():
+                names.append(re.split(r'[,;\t]', line, maxsplit=1)[0])
+
+        return [
+            name.strip().strip('@')
+            for name in names
+            if name.strip().strip('@') and name.strip().lower() != 'username'
+        ]
+
+    async def _reply_in_chunks(self, update: Update, lines: list[str]):
+        """Send a long list of lines as several messages"""
+        chunk = ""
+        for line in lines:
+            if len(chunk) + len(line) + 1 > REPLY_CHUNK_SIZE:
+                await update.message.reply_text(chunk)
+                chunk = ""
+            chunk += line + "\n"
+        if chunk:
+            await update.message.reply_text(chunk)
+
+    @admin_only
+    async def import_accounts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle the /import_accounts command"""
+        try:
+            logger.info(f"Import accounts command received from user {update.effective_user.id}")
+
+            usernames = await self._read_import_usernames(update, context)
+            if not usernames:
+                await update.message.reply_text(
+					"Please provide usernames or attach a file with one username per line.\n"
+					"Usage: /import_accounts <@user1> <@user2> ...\n"
+					"or reply to a .txt/.csv file with /import_accounts"
+				)
+                return
+
+            results = {}
+            candidates = {}
+            for username in usernames:
+                key = username.lower()
+                if key in results or key in candidates:
+                    continue
+                if not USERNAME_PATTERN.match(username):
+                    results[key] = f"⚠️ @{username} - invalid username"
+                else:
+                    candidates[key] = username
+
+            # One query for what is already monitored
+            existing = {
+                account.twitter_username.lower()
+                for account in await self.account_queries.get_all_accounts()
+            }
+            for key in list(candidates):
+                if key in existing:
+                    results[key] = f"⏭ @{candidates.pop(key)} - already monitored"
+
+            await update.message.reply_text(f"Resolving {len(candidates)} usernames...")
+            resolved = await self.twitter_monitor.get_user_ids(list(candidates.values()))
+
+            to_add = []
+            for key, username in candidates.items():
+                if key in resolved:
+                    to_add.append(resolved[key])
+                else:
+                    results[key] = f"❌ @{username} - not found"
+
+            added = await self.account_queries.add_accounts(to_add, added_by=update.effective_user.id)
+            added_ids = {account.twitter_id for account in added}
+            for username, twitter_id in to_add:
+                if twitter_id in added_ids:
+                    results[username.lower()] = f"✅ @{username} - added"
+                else:
+                    results[username.lower()] = f"⏭ @{username} - already monitored"
+
+            await self.twitter_monitor.users_added(
+				[(account.twitter_username, account.twitter_id) for account in added]
+			)
+
+            summary = (
+				f"Import finished: {len(added)} added, "
+				f"{len(results) - len(added)} skipped of {len(results)} usernames.\n"
+			)
+            lines = [summary] + [
+                results[key] for key in dict.fromkeys(name.lower() for name in usernames)
+            ]
+            await self._reply_in_chunks(update, lines)
+            logger.info(f"Imported {len(added)} accounts for {update.effective_user.id}")
+
+        except Exception as e:
+            logger.error(f"Error in import_accounts command: {e}")
+            await update.message.reply_text(
+				"Sorry, there was an error importing the accounts. Please try again."
+			)
+
+    @admin_only
+    async def export_accounts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle the /export_accounts command"""
+        try:
+            logger.info(f"Export accounts command received from user {update.effective_user.id}")
+
+            # Rows stream from the database into a file that spills to disk when large
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE, mode='w+b') as document:
+                text = io.TextIOWrapper(document, encoding='utf-8', newline='')
+                writer = csv.writer(text)
+                writer.writerow(["username", "twitter_id", "added_by"])
+                count = 0
+                async for account in self.account_queries.iter_accounts():
+                    writer.writerow([account.twitter_username, account.twitter_id, account.added_by])
+                    count += 1
+                text.flush()
+                text.detach()
+
+                if not count:
+                    await update.message.reply_text("No accounts are currently being monitored.")
+                    return
+
+                document.seek(0)
+                await update.message.reply_document(
+					document=document,
+					filename="monitored_accounts.csv",
+					caption=f"{count} monitored accounts"
+				)
+            logger.info("Account export sent successfully")
+
+        except Exception as e:
+            logger.error(f"Error in export_accounts command: {e}")
+            await update.message.reply_text(
+				"Sorry, there was an error exporting the accounts. Please try again."
+			)
+
     async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle the /help command"""
         try:
             logger.info(f"Help command received from user {update.effective_user.id}")
 
             # Get user role
-            user = self.user_queries.get_user(str(update.effective_user.id))
+            user = await self.user_queries.get_user(str(update.effective_user.id))
             if not user:
                 await update.message.reply_text(
 					"Welcome! Please request access using /request_access"
@@ -387,8 +537,11 @@ class Commands:
 				"/add_account - Add Twitter account to monitor\n"
 				"/remove_account - Remove monitored Twitter account\n"
 				"/list_accounts - List all monitored accounts\n"
+				"/import_accounts - Add many Twitter accounts from a list or file\n"
+				"/export_accounts - Export monitored accounts as CSV\n"
 				"/start_monitoring - Start monitoring Twitter accounts\n"
 				"/stop_monitoring - Stop monitoring Twitter accounts\n"
+				"/stats - Show monitor performance stats\n"
 				"/help - Show available commands"
 			)
 
@@ -420,15 +573,8 @@ class Commands:
                 )
                 return
 
-            # list of usernames and twitter ids
-            users = [
-                (account.twitter_username, account.twitter_id)
-                for account in self.account_queries.get_all_accounts()
-            ]
-
-            # Start monitoring
-            asyncio.create_task(self.twitter_monitor.monitor(users))
-            self.is_monitoring = True
+            # The leader starts monitoring every account in the database
+            await self.twitter_monitor.request_monitoring(True)
             await update.message.reply_text("Twitter account monitoring started.")
             logger.info("Twitter account monitoring started")
         except Exception as e:
@@ -444,15 +590,14 @@ class Commands:
             logger.info(
                 f"Stop monitoring command received from user {update.effective_user.id}"
             )
-            if not self.is_monitoring:
+            if self.twitter_monitor.is_leader and not self.is_monitoring:
                 await update.message.reply_text(
                     "Twitter account monitoring is not running."
                 )
                 return
 
-            # Stop monitoring
-            asyncio.create_task(self.twitter_monitor.stop_monitoring())
-            self.is_monitoring = False
+            # Stop monitoring on the leader
+            await self.twitter_monitor.request_monitoring(False)
             await update.message.reply_text("Twitter account monitoring stopped.")
             logger.info("Twitter account monitoring stopped")
         except Exception as e:
@@ -460,3 +605,54 @@ class Commands:
             await update.message.reply_text(
                 "Sorry, there was an error stopping the Twitter account monitoring. Please try again."
             )
+
+    @staticmethod
+    def _format_seconds(value: float | None) -> str:
+        return f"{value:.1f}s" if value is not None else "n/a"
+
+    @admin_only
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle the /stats command"""
+        try:
+            logger.info(f"Stats command received from user {update.effective_user.id}")
+            if not self.twitter_monitor.is_leader:
+                await update.message.reply_text(
+                    "Monitoring stats are kept by the leader worker process."
+                )
+                return
+
+            stats = self.twitter_monitor.stats()
+            lines = [
+                "📈 Monitor Stats:",
+                f"Status: {'running' if stats['monitoring'] else 'stopped'}",
+                f"Accounts monitored: {stats['accounts']} ({stats['push_accounts']} via webhook)",
+            ]
+            if stats['shards']:
+                lines.append(f"Polling split across {stats['shards']} shard processes")
+            lines += [
+                f"Last cycle: {self._format_seconds(stats['last_cycle'])}",
+                f"Detection latency p50/p95: {self._format_seconds(stats['latency_p50'])}"
+                f" / {self._format_seconds(stats['latency_p95'])}",
+                f"Pending messages: {stats['pending_messages']}",
+                f"Errors: monitor {stats['errors']['monitor']:.0f}, "
+                f"Twitter {stats['errors']['twitter_failed']:.0f}, "
+                f"Telegram {stats['errors']['telegram_failed']:.0f}",
+                f"Duplicates suppressed: {stats['duplicates']:.0f}",
+                "",
+                "Tokens:"
+            ]
+            for name, token in stats['tokens'].items():
+                remaining = token['rate_limit_remaining']
+                lines.append(
+                    f"• {name}: {token['requests']} requests, "
+                    f"{remaining if remaining is not None else '?'} remaining"
+                    f"{'' if token['authorized'] else ' (unauthorized)'}"
+                )
+
+            await update.message.reply_text("\n".join(lines))
+            logger.info("Stats sent successfully")
+        except Exception as e:
+            logger.error(f"Error in stats command: {e}")
+            await update.message.reply_text(
+                "Sorry, there was an error collecting the stats. Please try again."
+            )
@@ -0,0 +1,126 @@
+# bot/delivery.py
+import asyncio
+import time
+import logging
+from telegram.error import RetryAfter
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramDelivery:
+    """
+    Outbound Telegram queue drained by a pool of sender workers.
+    Chats are pinned to one worker so messages to a chat keep their order,
+    and sends respect both a per-chat and a global token bucket.
+    """
+
+    def __init__(self, app, workers: int, global_rate: float, chat_rate: float, max_retries: int = 3):
+        self.app = app
+        self.queues = [asyncio.Queue() for _ in range(max(workers, 1))]
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets = {}
+        self.max_retries = max_retries
+        self.tasks = []
+
+    @property
+    def pending(self) -> int:
+        """Number of messages waiting to be sent"""
+        return sum(queue.qsize() for queue in self.queues)
+
+    def enqueue(self, chat_id, message: str, reply_markup=None):
+        """Hand a message off to its chat's sender worker without waiting"""
+        kwargs = {
+            'chat_id': chat_id,
+            'text': message,
+            'parse_mode': 'HTML',
+            'disable_web_page_preview': True  # Prevent URL preview for cleaner look
+        }
+        if reply_markup:
+            kwargs['reply_markup'] = reply_markup
+
+        queue = self.queues[hash(str(chat_id)) % len(self.queues)]
+        queue.put_nowait(kwargs)
+
+    def start(self):
+        """Start the sender workers"""
+        if self.tasks:
+            return
+        self.tasks = [asyncio.create_task(self.worker(queue)) for queue in self.queues]
+        logger.info(f"Started {len(self.tasks)} Telegram sender workers")
+
+    async def stop(self, timeout: float = 10):
+        """Give queued messages a chance to drain, then stop the workers"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.pending} undelivered Telegram messages on shutdown")
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def worker(self, queue: asyncio.Queue):
+        """Send messages from one queue until cancelled"""
+        while True:
+            kwargs = await queue.get()
+            try:
+                await self.send(kwargs)
+            except Exception as e:
+                metrics.TELEGRAM_MESSAGES.inc("error")
+                logger.error(f"Error sending message to Telegram: {e}")
+            finally:
+                queue.task_done()
+
+    async def send(self, kwargs: dict):
+        """Send one message, honouring rate limits and RetryAfter responses"""
+        chat_id = kwargs['chat_id']
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                with metrics.TELEGRAM_SEND_SECONDS.time():
+                    await self.app.bot.send_message(**kwargs)
+                metrics.TELEGRAM_MESSAGES.inc("sent")
+                return
+            except RetryAfter as e:
+                metrics.TELEGRAM_MESSAGES.inc("retry_after")
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(f"Telegram flood limit for chat {chat_id}, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+
+        metrics.TELEGRAM_MESSAGES.inc("dropped")
+        logger.error(f"Giving up on message to chat {chat_id} after {self.max_retries} retries")
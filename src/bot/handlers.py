@@ -29,10 +29,18 @@ class BotHandlers:
             app.add_handler(CommandHandler("add_account", self.commands.add_account))
             app.add_handler(CommandHandler("remove_account", self.commands.remove_account))
             app.add_handler(CommandHandler("list_accounts", self.commands.list_accounts))
+            app.add_handler(CommandHandler("import_accounts", self.commands.import_accounts))
+            app.add_handler(CommandHandler("export_accounts", self.commands.export_accounts))
+            # A file uploaded with /import_accounts as its caption
+            app.add_handler(MessageHandler(
+                filters.Document.ALL & filters.CaptionRegex(r'^/import_accounts'),
+                self.commands.import_accounts
+            ))
 
             # Start/stop monitoring commands
             app.add_handler(CommandHandler("start_monitoring", self.commands.start_monitoring))
             app.add_handler(CommandHandler("stop_monitoring", self.commands.stop_monitoring))
+            app.add_handler(CommandHandler("stats", self.commands.stats))
 
             # Handle unknown commands
             app.add_handler(MessageHandler(
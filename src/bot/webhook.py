@@ -0,0 +1,49 @@
+# bot/webhook.py
+import hmac
+import logging
+from fastapi import APIRouter, HTTPException, Request
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+class TelegramWebhook:
+    """Receives Telegram updates over HTTP and feeds them to the Application update queue"""
+
+    PATH = "/telegram/webhook"
+
+    def __init__(self, app, url: str, secret_token: str):
+        if not secret_token:
+            raise ValueError("A secret token is required for the Telegram webhook")
+        self.app = app
+        self.url = url
+        self.secret_token = secret_token
+
+    async def register(self):
+        """Point Telegram at this app's webhook endpoint"""
+        await self.app.bot.set_webhook(
+            url=self.url,
+            secret_token=self.secret_token,
+            allowed_updates=Update.ALL_TYPES
+        )
+        logger.info(f"Telegram webhook registered at {self.url}")
+
+    def verify_secret(self, header: str) -> bool:
+        """Check the X-Telegram-Bot-Api-Secret-Token header"""
+        return bool(header) and hmac.compare_digest(header, self.secret_token)
+
+    def router(self) -> APIRouter:
+        """FastAPI route accepting Telegram updates"""
+        router = APIRouter()
+
+        @router.post(self.PATH)
+        async def receive_update(request: Request):
+            if not self.verify_secret(request.headers.get('x-telegram-bot-api-secret-token')):
+                raise HTTPException(status_code=403, detail="Invalid secret token")
+            try:
+                update = Update.de_json(await request.json(), self.app.bot)
+                await self.app.update_queue.put(update)
+            except Exception as e:
+                logger.error(f"Error queueing Telegram update: {e}")
+            return {"ok": True}
+
+        return router
@@ -1,7 +1,8 @@
 import os
+import re
 from pathlib import Path
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 @dataclass
@@ -29,6 +30,52 @@ class Config:
 	DX_TWITTER_ACCESS_TOKEN: str
 	DX_TWITTER_ACCESS_SECRET: str
 
+	# Account Activity webhook (consumer secret signs CRC checks and payloads)
+	TWITTER_WEBHOOK_SECRET: Optional[str] = None
+	TWITTER_WEBHOOK_ID: Optional[str] = None
+
+	# Additional bearer tokens for the token pool
+	TWITTER_BEARER_TOKENS: list = field(default_factory=list)
+
+	# Twitter HTTP client
+	TWITTER_API_BASE_URL: str = "https://api.twitter.com/2"
+	TWITTER_HTTP_POOL_SIZE: int = 20
+	TWITTER_HTTP_TIMEOUT: float = 10.0
+	TWITTER_POLL_CONCURRENCY: int = 20
+	TWITTER_MAX_POLL_INTERVAL: int = 300
+	TWITTER_POLL_BACKOFF: float = 1.5
+	TWITTER_REQUEST_BUDGET: int = 900
+	TWITTER_BATCH_MODE: bool = False
+	TWITTER_INGESTION_MODE: str = "poll"
+	TWITTER_SEARCH_QUERY_LIMIT: int = 512
+	CHECKPOINT_FLUSH_INTERVAL: int = 30
+	TWITTER_DIGEST_MODE: bool = False
+	TWITTER_DIGEST_WINDOW: int = 0
+	RECIPIENT_CACHE_TTL: int = 300
+	USERNAME_CACHE_SIZE: int = 1024
+	USERNAME_CACHE_TTL: int = 86400
+	USERNAME_NEGATIVE_TTL: int = 600
+	DEDUP_CAPACITY: int = 10000
+
+	# Worker processes and leader election (the leader runs the monitor)
+	WEB_WORKERS: int = 1
+	LEADER_LOCK_FILE: str = ""
+	LEADER_RETRY_INTERVAL: int = 10
+	LEADER_EVENT_INTERVAL: float = 1.0
+	MONITOR_AUTOSTART: bool = False
+	MONITOR_SHARDS: int = 0
+	SHARD_REPORT_INTERVAL: float = 5.0
+
+	# Telegram updates (webhook mode when TELEGRAM_WEBHOOK_URL is set, else long polling)
+	TELEGRAM_WEBHOOK_URL: Optional[str] = None
+	TELEGRAM_WEBHOOK_SECRET: Optional[str] = None
+	TELEGRAM_CONCURRENT_UPDATES: int = 1
+
+	# Telegram delivery
+	TELEGRAM_SEND_WORKERS: int = 4
+	TELEGRAM_GLOBAL_RATE: float = 25.0
+	TELEGRAM_CHAT_RATE: float = 1.0
+
 	@classmethod
 	def load_config(cls) -> 'Config':
 		"""Load configuration from environment file"""
@@ -53,6 +100,15 @@ class Config:
 				f"Missing required environment variables: {', '.join(missing_vars)}"
 			)
 
+		# Anyone who finds the webhook URL could post forged updates without a secret
+		if os.getenv('TELEGRAM_WEBHOOK_URL'):
+			secret = os.getenv('TELEGRAM_WEBHOOK_SECRET') or ''
+			if not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', secret):
+				raise EnvironmentError(
+					"TELEGRAM_WEBHOOK_SECRET is required when TELEGRAM_WEBHOOK_URL is set "
+					"(1-256 characters of A-Z, a-z, 0-9, _ and -)"
+				)
+
 		# Database URL defaults to SQLite if not provided
 		database_url = os.getenv(
 			'DATABASE_URL',
@@ -77,5 +133,47 @@ class Config:
 			DX_TWITTER_CLIENT_SECRET=os.getenv('DX_TWITTER_CLIENT_SECRET'),
 			TWITTER_POLL_INTERVAL=int(os.getenv('TWITTER_POLL_INTERVAL')),
 			DATABASE_URL=database_url,
-			SUPER_ADMIN_ID=os.getenv('SUPER_ADMIN_ID')
+			SUPER_ADMIN_ID=os.getenv('SUPER_ADMIN_ID'),
+			TWITTER_WEBHOOK_SECRET=os.getenv('TWITTER_WEBHOOK_SECRET'),
+			TWITTER_WEBHOOK_ID=os.getenv('TWITTER_WEBHOOK_ID'),
+			TWITTER_BEARER_TOKENS=[
+				token.strip()
+				for token in os.getenv('TWITTER_BEARER_TOKENS', '').split(',')
+				if token.strip()
+			],
+			TWITTER_API_BASE_URL=os.getenv('TWITTER_API_BASE_URL', "https://api.twitter.com/2"),
+			TWITTER_HTTP_POOL_SIZE=int(os.getenv('TWITTER_HTTP_POOL_SIZE', 20)),
+			TWITTER_HTTP_TIMEOUT=float(os.getenv('TWITTER_HTTP_TIMEOUT', 10.0)),
+			TWITTER_POLL_CONCURRENCY=int(os.getenv('TWITTER_POLL_CONCURRENCY', 20)),
+			TWITTER_MAX_POLL_INTERVAL=int(os.getenv('TWITTER_MAX_POLL_INTERVAL', 300)),
+			TWITTER_POLL_BACKOFF=float(os.getenv('TWITTER_POLL_BACKOFF', 1.5)),
+			TWITTER_REQUEST_BUDGET=int(os.getenv('TWITTER_REQUEST_BUDGET', 900)),
+			TWITTER_BATCH_MODE=os.getenv('TWITTER_BATCH_MODE', 'false').lower() == 'true',
+			TWITTER_INGESTION_MODE=os.getenv('TWITTER_INGESTION_MODE', 'poll').lower(),
+			TWITTER_SEARCH_QUERY_LIMIT=int(os.getenv('TWITTER_SEARCH_QUERY_LIMIT', 512)),
+			CHECKPOINT_FLUSH_INTERVAL=int(os.getenv('CHECKPOINT_FLUSH_INTERVAL', 30)),
+			TWITTER_DIGEST_MODE=os.getenv('TWITTER_DIGEST_MODE', 'false').lower() == 'true',
+			TWITTER_DIGEST_WINDOW=int(os.getenv('TWITTER_DIGEST_WINDOW', 0)),
+			RECIPIENT_CACHE_TTL=int(os.getenv('RECIPIENT_CACHE_TTL', 300)),
+			USERNAME_CACHE_SIZE=int(os.getenv('USERNAME_CACHE_SIZE', 1024)),
+			USERNAME_CACHE_TTL=int(os.getenv('USERNAME_CACHE_TTL', 86400)),
+			USERNAME_NEGATIVE_TTL=int(os.getenv('USERNAME_NEGATIVE_TTL', 600)),
+			DEDUP_CAPACITY=int(os.getenv('DEDUP_CAPACITY', 10000)),
+			WEB_WORKERS=int(os.getenv('WEB_WORKERS', 1)),
+			# An empty value (as in .env.example) means the default path
+			LEADER_LOCK_FILE=(
+				os.getenv('LEADER_LOCK_FILE')
+				or os.path.expanduser('~/.twitter-monitor.lock')
+			),
+			LEADER_RETRY_INTERVAL=int(os.getenv('LEADER_RETRY_INTERVAL', 10)),
+			LEADER_EVENT_INTERVAL=float(os.getenv('LEADER_EVENT_INTERVAL', 1.0)),
+			MONITOR_AUTOSTART=os.getenv('MONITOR_AUTOSTART', 'false').lower() == 'true',
+			MONITOR_SHARDS=int(os.getenv('MONITOR_SHARDS', 0)),
+			SHARD_REPORT_INTERVAL=float(os.getenv('SHARD_REPORT_INTERVAL', 5.0)),
+			TELEGRAM_WEBHOOK_URL=os.getenv('TELEGRAM_WEBHOOK_URL'),
+			TELEGRAM_WEBHOOK_SECRET=os.getenv('TELEGRAM_WEBHOOK_SECRET'),
+			TELEGRAM_CONCURRENT_UPDATES=int(os.getenv('TELEGRAM_CONCURRENT_UPDATES', 1)),
+			TELEGRAM_SEND_WORKERS=int(os.getenv('TELEGRAM_SEND_WORKERS', 4)),
+			TELEGRAM_GLOBAL_RATE=float(os.getenv('TELEGRAM_GLOBAL_RATE', 25.0)),
+			TELEGRAM_CHAT_RATE=float(os.getenv('TELEGRAM_CHAT_RATE', 1.0))
 		)
\ No newline at end of file
@@ -1,5 +1,5 @@
 # db/models.py
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -24,6 +24,39 @@ class MonitoredAccount(Base):
 	webhook_id = Column(String)
 
 
+class TweetCheckpoint(Base):
+	__tablename__ = 'tweet_checkpoints'
+
+	id = Column(Integer, primary_key=True)
+	twitter_id = Column(String, unique=True)
+	since_id = Column(String)
+	updated_at = Column(DateTime)
+
+
+class DeliveredTweet(Base):
+	__tablename__ = 'delivered_tweets'
+
+	id = Column(Integer, primary_key=True)
+	tweet_id = Column(String, unique=True)
+	delivered_at = Column(DateTime)
+
+
+class RelayedEvent(Base):
+	__tablename__ = 'relayed_events'
+
+	id = Column(Integer, primary_key=True)
+	kind = Column(String)
+	payload = Column(Text)  # JSON
+	created_at = Column(DateTime)
+
+
+class Setting(Base):
+	__tablename__ = 'settings'
+
+	key = Column(String, primary_key=True)
+	value = Column(String)
+
+
 class AccessRequest(Base):
 	__tablename__ = 'access_requests'
 
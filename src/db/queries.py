@@ -1,111 +1,402 @@
 # db/queries.py
-from sqlalchemy.orm import Session
-from .models import User, MonitoredAccount, AccessRequest
+import json
+import time
+import datetime
+from sqlalchemy import select, delete, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from .models import User, MonitoredAccount, AccessRequest, TweetCheckpoint, DeliveredTweet, RelayedEvent, Setting
 
 class UserQueries:
-	def __init__(self, session: Session, config):
-		self.session = session
+	def __init__(self, session_factory: async_sessionmaker, config):
+		# Every method opens its own session (one unit of work per call)
+		self.session_factory = session_factory
+		self.super_admin_id = config.SUPER_ADMIN_ID
+		# In-process cache of role -> chat ids, invalidated on role changes
+		self.recipient_cache_ttl = config.RECIPIENT_CACHE_TTL
+		self._recipient_cache = {}
+		# LeaderRelay telling the leader about role changes made in this worker
+		self.relay = None
+
+	async def ensure_super_admin(self):
 		# create an initial user using config.SUPER_ADMIN_ID
-		user = self.get_user(telegram_id=config.SUPER_ADMIN_ID)
+		user = await self.get_user(telegram_id=self.super_admin_id)
 		if not user:
-			user = self.create_user(
-				telegram_id=config.SUPER_ADMIN_ID,
+			user = await self.create_user(
+				telegram_id=self.super_admin_id,
 				username='admin',
 				role='super_admin'
 			)
 			print(f'Created super admin: {user.username}')
 		print(f'Super admin already exists: \n - username: {user.username} \n - telegram_id: {user.telegram_id}\n - role: {user.role}')
-		
 
-	def get_user(self, telegram_id: str):
-		return self.session.query(User).filter_by(telegram_id=telegram_id).first()
+	async def get_user(self, telegram_id: str):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User).filter_by(telegram_id=str(telegram_id))
+			)
+			return result.scalars().first()
 
-	def create_user(self, telegram_id: str, username: str, role: str):
-		user = User(telegram_id=telegram_id, username=username, role=role)
-		self.session.add(user)
-		self.session.commit()
+	async def create_user(self, telegram_id: str, username: str, role: str):
+		user = User(telegram_id=str(telegram_id), username=username, role=role)
+		async with self.session_factory() as session:
+			session.add(user)
+			await session.commit()
+		await self.roles_changed()
 		return user
 
-	def create_access_request(self, user_id: int):
-		if self.session.query(AccessRequest).filter_by(
-				user_id=user_id,
-				status='pending'
-		).first():
-			self.session.query(AccessRequest).filter_by(
-				user_id=user_id,
-				status='pending'
-			).delete()
-
-		request = AccessRequest(user_id=user_id, status='pending')
-		self.session.add(request)
-		self.session.commit()
+	async def set_user_role(self, telegram_id: str, role: str):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User).filter_by(telegram_id=str(telegram_id))
+			)
+			user = result.scalars().first()
+			if not user:
+				return False
+			user.role = role
+			await session.commit()
+		await self.roles_changed()
+		return True
+
+	async def delete_user(self, telegram_id: str):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				delete(User).filter_by(telegram_id=str(telegram_id))
+			)
+			await session.commit()
+		await self.roles_changed()
+		return result.rowcount > 0
+
+	async def create_access_request(self, user_id: int):
+		async with self.session_factory() as session:
+			await session.execute(
+				delete(AccessRequest).filter_by(
+					user_id=user_id,
+					status='pending'
+				)
+			)
+
+			request = AccessRequest(user_id=user_id, status='pending')
+			session.add(request)
+			await session.commit()
 		return True
-	def get_admin_chat_ids(self):
-		admins = self.session.query(User).filter(
-			User.role.in_(['admin', 'super_admin'])
-		).all()
-		return [admin.telegram_id for admin in admins]
-
-	def get_super_admin_chat_ids(self):
-		admins = self.session.query(User).filter(
-			User.role.in_(['super_admin'])
-		).all()
-		return [admin.telegram_id for admin in admins]
+
+	async def _get_chat_ids_by_roles(self, roles: tuple):
+		cached = self._recipient_cache.get(roles)
+		if cached and time.monotonic() - cached[0] < self.recipient_cache_ttl:
+			return cached[1]
+
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User.telegram_id).filter(User.role.in_(roles))
+			)
+			chat_ids = list(result.scalars().all())
+		self._recipient_cache[roles] = (time.monotonic(), chat_ids)
+		return chat_ids
+
+	def invalidate_recipient_cache(self):
+		"""Drop cached recipients after a role change"""
+		self._recipient_cache.clear()
+
+	async def roles_changed(self):
+		"""
+		Invalidate this worker's recipients and the leader's. Shard processes
+		keep theirs for up to RECIPIENT_CACHE_TTL seconds.
+		"""
+		self.invalidate_recipient_cache()
+		if self.relay:
+			await self.relay.send('roles_changed', {})
+
+	async def get_admin_chat_ids(self):
+		return await self._get_chat_ids_by_roles(('admin', 'super_admin'))
+
+	async def get_super_admin_chat_ids(self):
+		return await self._get_chat_ids_by_roles(('super_admin',))
 
 class AccountQueries:
-	def __init__(self, session: Session):
-		self.session = session
-	
-	def add_account(self, username: str, twitter_id: str, added_by: int):
+	def __init__(self, session_factory: async_sessionmaker):
+		self.session_factory = session_factory
+
+	async def add_account(self, username: str, twitter_id: str, added_by: int):
 		account = MonitoredAccount(
 			twitter_username=username,
 			twitter_id=twitter_id,
 			added_by=added_by
 		)
-		self.session.add(account)
-		self.session.commit()
+		async with self.session_factory() as session:
+			session.add(account)
+			await session.commit()
 		return account
-	
-	def get_account_by_username(self, twitter_username: str):
-		return self.session.query(MonitoredAccount).filter_by(
-			twitter_username=twitter_username
-		).first()
-	
-	def get_account_by_twitter_id(self, twitter_id: str):
-		return self.session.query(MonitoredAccount).filter_by(
-			twitter_id=twitter_id
-		).first()
-	
-	def get_all_accounts(self):
-		return self.session.query(MonitoredAccount).all()
-	
-	def update_webhook_id(self, account_id: int, webhook_id: str):
-		account = self.session.query(MonitoredAccount).get(account_id)
-		if account:
-			account.webhook_id = webhook_id
-			self.session.commit()
-			return True
+
+	async def add_accounts(self, accounts: list[tuple], added_by: int):
+		"""
+		Insert (username, twitter_id) pairs in one commit, skipping ones whose
+		twitter_id or username (in any case) is already stored or repeated
+		"""
+		if not accounts:
+			return []
+
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(MonitoredAccount.twitter_id, MonitoredAccount.twitter_username).filter(or_(
+					MonitoredAccount.twitter_id.in_([twitter_id for _, twitter_id in accounts]),
+					func.lower(MonitoredAccount.twitter_username).in_(
+						[username.lower() for username, _ in accounts]
+					)
+				))
+			)
+			existing_ids, existing_names = set(), set()
+			for twitter_id, username in result.all():
+				existing_ids.add(twitter_id)
+				existing_names.add(username.lower())
+
+			added = []
+			for username, twitter_id in accounts:
+				if twitter_id in existing_ids or username.lower() in existing_names:
+					continue
+				existing_ids.add(twitter_id)
+				existing_names.add(username.lower())
+				added.append(
+					MonitoredAccount(twitter_username=username, twitter_id=twitter_id, added_by=added_by)
+				)
+
+			session.add_all(added)
+			try:
+				await session.commit()
+				return added
+			except IntegrityError:
+				# Another worker stored some of them meanwhile, insert row by row
+				await session.rollback()
+
+		stored = []
+		for account in added:
+			account = MonitoredAccount(
+				twitter_username=account.twitter_username,
+				twitter_id=account.twitter_id,
+				added_by=added_by
+			)
+			async with self.session_factory() as session:
+				session.add(account)
+				try:
+					await session.commit()
+				except IntegrityError:
+					continue
+			stored.append(account)
+		return stored
+
+	async def delete_account(self, account_id: int):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				delete(MonitoredAccount).filter_by(id=account_id)
+			)
+			await session.commit()
+		return result.rowcount > 0
+
+	async def get_account_by_username(self, twitter_username: str):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(MonitoredAccount).filter_by(twitter_username=twitter_username)
+			)
+			return result.scalars().first()
+
+	async def get_accounts_by_usernames(self, usernames: list[str], chunk_size: int = 500) -> dict:
+		"""Stored accounts matching the usernames in any case, keyed by lowercase username"""
+		keys = list(dict.fromkeys(username.lower() for username in usernames))
+		accounts = {}
+		async with self.session_factory() as session:
+			for start in range(0, len(keys), chunk_size):
+				result = await session.execute(
+					select(MonitoredAccount).filter(
+						func.lower(MonitoredAccount.twitter_username).in_(keys[start:start + chunk_size])
+					)
+				)
+				for account in result.scalars():
+					accounts[account.twitter_username.lower()] = account
+		return accounts
+
+	async def get_account_by_twitter_id(self, twitter_id: str):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(MonitoredAccount).filter_by(twitter_id=twitter_id)
+			)
+			return result.scalars().first()
+
+	async def get_all_accounts(self):
+		async with self.session_factory() as session:
+			result = await session.execute(select(MonitoredAccount))
+			return list(result.scalars().all())
+
+	async def iter_accounts(self, batch_size: int = 500):
+		"""Stream every account without loading the whole table at once"""
+		async with self.session_factory() as session:
+			result = await session.stream_scalars(
+				select(MonitoredAccount)
+				.order_by(MonitoredAccount.id)
+				.execution_options(yield_per=batch_size)
+			)
+			async for account in result:
+				yield account
+
+	async def update_webhook_id(self, account_id: int, webhook_id: str):
+		async with self.session_factory() as session:
+			account = await session.get(MonitoredAccount, account_id)
+			if account:
+				account.webhook_id = webhook_id
+				await session.commit()
+				return True
 		return False
-	
-	def get_admin_ids(self):
-		admins = self.session.query(User).filter(
-			User.role.in_(['admin', 'super_admin'])
-		).all()
-		return [admin.telegram_id for admin in admins]
-	
-	def get_accounts_by_admin(self, admin_id: int):
-		return self.session.query(MonitoredAccount).filter_by(
-			added_by=admin_id
-		).all()
-
-	def get_admin_chat_ids(self):
-		admins = self.session.query(User).filter(
-			User.role.in_(['admin', 'super_admin'])
-		).all()
-		return [admin.telegram_id for admin in admins]
-	
-	def get_super_admin_chat_ids(self):
-		admins = self.session.query(User).filter(
-			User.role.in_(['super_admin'])
-		).all()
-		return [admin.telegram_id for admin in admins]
+
+	async def get_checkpoints(self, twitter_ids: list = None, chunk_size: int = 500):
+		"""Stored since_ids keyed by twitter_id, only for the given IDs when passed"""
+		if twitter_ids is None:
+			statements = [select(TweetCheckpoint)]
+		else:
+			twitter_ids = list(twitter_ids)
+			# Chunked to stay under the database's bound parameter limit
+			statements = [
+				select(TweetCheckpoint).filter(
+					TweetCheckpoint.twitter_id.in_(twitter_ids[start:start + chunk_size])
+				)
+				for start in range(0, len(twitter_ids), chunk_size)
+			]
+
+		checkpoints = {}
+		async with self.session_factory() as session:
+			for statement in statements:
+				result = await session.execute(statement)
+				for checkpoint in result.scalars():
+					checkpoints[checkpoint.twitter_id] = checkpoint.since_id
+		return checkpoints
+
+	async def save_checkpoints(self, checkpoints: dict):
+		"""Upsert a batch of twitter_id -> since_id checkpoints in one commit"""
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(TweetCheckpoint).filter(
+					TweetCheckpoint.twitter_id.in_(list(checkpoints))
+				)
+			)
+			existing = {checkpoint.twitter_id: checkpoint for checkpoint in result.scalars().all()}
+			now = datetime.datetime.utcnow()
+			for twitter_id, since_id in checkpoints.items():
+				checkpoint = existing.get(twitter_id)
+				if checkpoint:
+					checkpoint.since_id = since_id
+					checkpoint.updated_at = now
+				else:
+					session.add(TweetCheckpoint(
+						twitter_id=twitter_id,
+						since_id=since_id,
+						updated_at=now
+					))
+			await session.commit()
+
+	async def delete_checkpoint(self, twitter_id: str):
+		async with self.session_factory() as session:
+			await session.execute(
+				delete(TweetCheckpoint).filter_by(twitter_id=twitter_id)
+			)
+			await session.commit()
+
+	async def get_recent_deliveries(self, limit: int):
+		"""Most recently delivered tweet IDs, newest first"""
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(DeliveredTweet.tweet_id).order_by(DeliveredTweet.id.desc()).limit(limit)
+			)
+			return list(result.scalars().all())
+
+	async def save_deliveries(self, tweet_ids: list):
+		"""Record delivered tweet IDs in one commit, ignoring ones already stored"""
+		tweet_ids = [str(tweet_id) for tweet_id in dict.fromkeys(tweet_ids)]
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(DeliveredTweet.tweet_id).filter(DeliveredTweet.tweet_id.in_(tweet_ids))
+			)
+			existing = set(result.scalars().all())
+			now = datetime.datetime.utcnow()
+			session.add_all([
+				DeliveredTweet(tweet_id=tweet_id, delivered_at=now)
+				for tweet_id in tweet_ids if tweet_id not in existing
+			])
+			await session.commit()
+
+	async def prune_deliveries(self, keep: int):
+		"""Delete all but the newest `keep` delivered tweet rows"""
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(DeliveredTweet.id).order_by(DeliveredTweet.id.desc()).offset(keep).limit(1)
+			)
+			threshold = result.scalar()
+			if threshold is not None:
+				await session.execute(
+					delete(DeliveredTweet).filter(DeliveredTweet.id <= threshold)
+				)
+				await session.commit()
+
+	async def get_setting(self, key: str, default: str = None) -> str | None:
+		async with self.session_factory() as session:
+			setting = await session.get(Setting, key)
+		return setting.value if setting else default
+
+	async def set_setting(self, key: str, value: str):
+		async with self.session_factory() as session:
+			setting = await session.get(Setting, key)
+			if setting:
+				setting.value = value
+			else:
+				session.add(Setting(key=key, value=value))
+			await session.commit()
+
+	async def push_event(self, kind: str, payload: dict):
+		"""Queue work for the leader process"""
+		async with self.session_factory() as session:
+			session.add(RelayedEvent(
+				kind=kind,
+				payload=json.dumps(payload),
+				created_at=datetime.datetime.utcnow()
+			))
+			await session.commit()
+
+	async def pop_events(self, limit: int = 100):
+		"""Take the oldest queued events, returns (kind, payload) pairs"""
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(RelayedEvent).order_by(RelayedEvent.id).limit(limit)
+			)
+			events = list(result.scalars().all())
+			if not events:
+				return []
+			await session.execute(
+				delete(RelayedEvent).filter(RelayedEvent.id.in_([event.id for event in events]))
+			)
+			await session.commit()
+		return [(event.kind, json.loads(event.payload)) for event in events]
+
+	async def get_admin_ids(self):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User.telegram_id).filter(User.role.in_(['admin', 'super_admin']))
+			)
+			return list(result.scalars().all())
+
+	async def get_accounts_by_admin(self, admin_id: int):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(MonitoredAccount).filter_by(added_by=admin_id)
+			)
+			return list(result.scalars().all())
+
+	async def get_admin_chat_ids(self):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User.telegram_id).filter(User.role.in_(['admin', 'super_admin']))
+			)
+			return list(result.scalars().all())
+
+	async def get_super_admin_chat_ids(self):
+		async with self.session_factory() as session:
+			result = await session.execute(
+				select(User.telegram_id).filter(User.role.in_(['super_admin']))
+			)
+			return list(result.scalars().all())
@@ -0,0 +1,57 @@
+# db/session.py
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from .models import Base
+import metrics
+
+# asyncio drivers used when DATABASE_URL names a plain dialect
+ASYNC_DRIVERS = {
+	'sqlite': 'sqlite+aiosqlite',
+	'postgresql': 'postgresql+asyncpg',
+	'postgres': 'postgresql+asyncpg',
+}
+
+
+def to_async_url(database_url: str) -> str:
+	"""Swap a sync database URL for its asyncio driver equivalent"""
+	scheme, separator, rest = database_url.partition('://')
+	if '+' in scheme:
+		# An explicit driver was configured, trust it
+		return database_url
+	return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def instrument_engine(engine: AsyncEngine):
+	"""Time every statement into the db_query_seconds histogram"""
+	@event.listens_for(engine.sync_engine, "before_cursor_execute")
+	def before_execute(connection, cursor, statement, parameters, context, executemany):
+		connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+	@event.listens_for(engine.sync_engine, "after_cursor_execute")
+	def after_execute(connection, cursor, statement, parameters, context, executemany):
+		started = connection.info['query_started'].pop()
+		statement_type = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+		metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement_type)
+
+	@event.listens_for(engine.sync_engine, "handle_error")
+	def on_error(context):
+		# A failed statement never reaches after_cursor_execute, drop its start time
+		if context.connection is not None:
+			started = context.connection.info.get('query_started')
+			if started:
+				started.pop()
+
+
+def create_session_factory(database_url: str) -> tuple[AsyncEngine, async_sessionmaker]:
+	"""Create the async engine and a session factory for per-unit-of-work sessions"""
+	engine = create_async_engine(to_async_url(database_url))
+	instrument_engine(engine)
+	session_factory = async_sessionmaker(engine, expire_on_commit=False)
+	return engine, session_factory
+
+
+async def init_models(engine: AsyncEngine):
+	"""Create all tables that do not exist yet"""
+	async with engine.begin() as connection:
+		await connection.run_sync(Base.metadata.create_all)
@@ -0,0 +1,108 @@
+# leader.py
+import os
+import fcntl
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaderLock:
+	"""Exclusive lock file held by at most one worker process at a time"""
+
+	def __init__(self, path: str):
+		self.path = path
+		self._file = None
+
+	@property
+	def held(self) -> bool:
+		return self._file is not None
+
+	def acquire(self, blocking: bool = False) -> bool:
+		"""Try to take the lock, returns True when this process holds it"""
+		if self._file:
+			return True
+
+		lock_file = open(self.path, 'a+')
+		flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+		try:
+			fcntl.flock(lock_file, flags)
+		except BlockingIOError:
+			lock_file.close()
+			return False
+
+		lock_file.truncate(0)
+		lock_file.write(str(os.getpid()))
+		lock_file.flush()
+		self._file = lock_file
+		return True
+
+	def release(self):
+		"""Release the lock if this process holds it"""
+		if not self._file:
+			return
+		try:
+			fcntl.flock(self._file, fcntl.LOCK_UN)
+		finally:
+			self._file.close()
+			self._file = None
+
+
+class LeaderRelay:
+	"""
+	Hands work that only the leader can do (the running monitor) from any
+	worker to the leader through a database queue. On the leader, events
+	are handled in place.
+	"""
+
+	def __init__(self, account_queries, interval: float = 1.0):
+		self.account_queries = account_queries
+		self.interval = interval
+		self.handlers = {}
+		self.active = False
+		self.task = None
+
+	def register(self, kind: str, handler):
+		"""Register the coroutine handling events of a kind on the leader"""
+		self.handlers[kind] = handler
+
+	async def send(self, kind: str, payload: dict):
+		"""Handle an event here when leader, otherwise queue it for the leader"""
+		if self.active:
+			await self.handlers[kind](payload)
+		else:
+			await self.account_queries.push_event(kind, payload)
+
+	def start(self):
+		"""Start draining the queue, called once this process becomes leader"""
+		self.active = True
+		if not self.task:
+			self.task = asyncio.create_task(self.run())
+
+	async def stop(self):
+		self.active = False
+		if self.task:
+			self.task.cancel()
+			try:
+				await self.task
+			except asyncio.CancelledError:
+				pass
+			self.task = None
+
+	async def run(self):
+		while True:
+			try:
+				events = await self.account_queries.pop_events()
+			except Exception as e:
+				logger.error(f"Error reading relayed events: {e}")
+				events = []
+			for kind, payload in events:
+				handler = self.handlers.get(kind)
+				if handler is None:
+					logger.warning(f"No handler for relayed event {kind}")
+					continue
+				try:
+					await handler(payload)
+				except Exception as e:
+					logger.error(f"Error handling relayed {kind} event: {e}")
+			if not events:
+				await asyncio.sleep(self.interval)
@@ -1,19 +1,24 @@
 # main.py
+import json
+import inspect
 import asyncio
 import logging
 from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI, Request
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import FastAPI, Request, Response
 from telegram.ext import ApplicationBuilder
 
 from config import Config
 from bot.commands import Commands
 from bot.handlers import BotHandlers
+from bot.delivery import TelegramDelivery
+from bot.webhook import TelegramWebhook
 from db.queries import UserQueries, AccountQueries
 from apis.x import TwitterManager
-from db.models import Base
+from apis.webhook import TwitterWebhook
+from db.session import create_session_factory, init_models
+from leader import LeaderLock
+import metrics
 
 logging.basicConfig(
 	level=logging.INFO,
@@ -35,8 +40,11 @@ async def setup_commands(app):
 			("add_account", "Add a Twitter account to monitor"),
 			("remove_account", "Remove a Twitter account from monitoring"),
 			("list_accounts", "List all monitored Twitter accounts"),
+			("import_accounts", "Add many Twitter accounts at once"),
+			("export_accounts", "Export monitored Twitter accounts"),
 			("start_monitoring", "Start monitoring Twitter accounts"),
 			("stop_monitoring", "Stop monitoring Twitter accounts"),
+			("stats", "Show monitor performance stats"),
 			("help", "Show help message")
 		]
 		await app.bot.set_my_commands(commands)
@@ -46,63 +54,172 @@ async def setup_commands(app):
 		raise
 
 
+async def become_leader(app: FastAPI):
+	"""Take over the single-process duties once this worker holds the leader lock"""
+	state = app.state
+	state.twitter_monitor.is_leader = True
+	state.twitter_monitor.relay.start()
+	logger.info("This worker is the leader")
+
+	await setup_commands(state.telegram_bot)
+	if hasattr(state, 'telegram_webhook'):
+		# Updates arrive on the FastAPI webhook route
+		await state.telegram_webhook.register()
+	else:
+		# Fall back to long polling, only one process may call getUpdates
+		await state.telegram_bot.updater.start_polling()
+		logger.info("Started polling for updates")
+
+	# Resume monitoring a previous leader was running
+	if state.config.MONITOR_AUTOSTART or await state.twitter_monitor.monitoring_requested():
+		await state.twitter_monitor.start_from_database()
+
+
+async def leader_loop(app: FastAPI):
+	"""Keep trying for the leader lock so another worker takes over if the leader exits"""
+	lock = app.state.leader_lock
+	while True:
+		try:
+			if await asyncio.to_thread(lock.acquire):
+				break
+		except Exception as e:
+			# A bad lock path must not stop the worker from retrying or shutting down
+			logger.error(f"Error acquiring leader lock {lock.path}: {e}")
+		await asyncio.sleep(app.state.config.LEADER_RETRY_INTERVAL)
+	try:
+		await become_leader(app)
+	except Exception as e:
+		logger.error(f"Error taking over as leader: {e}")
+
+
+async def teardown(name: str, step):
+	"""Run one shutdown step, logging failures so the remaining steps still run"""
+	try:
+		result = step()
+		if inspect.isawaitable(result):
+			await result
+	except asyncio.CancelledError:
+		pass
+	except Exception as e:
+		logger.error(f"Error during shutdown ({name}): {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-	"""Manage application lifespan"""
+	"""Manage application lifespan, everything here runs on uvicorn's event loop"""
+	state = app.state
 	try:
-		if hasattr(app.state, 'telegram_bot'):
-			await app.state.telegram_bot.initialize()
-			await app.state.telegram_bot.start()
-			await setup_commands(app.state.telegram_bot)
-			
-			# Start polling in a background task
-			app.state.polling_task = asyncio.create_task(
-				app.state.telegram_bot.updater.start_polling()
-			)
-			logger.info("Started polling for updates")
+		# Serialize schema creation and seeding across worker processes
+		init_lock = LeaderLock(f"{state.config.LEADER_LOCK_FILE}.init")
+		await asyncio.to_thread(init_lock.acquire, True)
+		try:
+			await init_models(state.db_engine)
+			await state.user_queries.ensure_super_admin()
+		finally:
+			init_lock.release()
+
+		await state.telegram_bot.initialize()
+		await state.telegram_bot.start()
+		state.delivery.start()
+
+		state.leader_task = asyncio.create_task(leader_loop(app))
 		
 		yield
 	finally:
-		if hasattr(app.state, 'telegram_bot'):
-			if hasattr(app.state, 'polling_task'):
-				app.state.polling_task.cancel()
-				try:
-					await app.state.polling_task
-				except asyncio.CancelledError:
-					pass
-			await app.state.telegram_bot.stop()
-
-
-async def create_app(app_config: Config):
-	"""Create and configure the application"""
+		if hasattr(state, 'leader_task'):
+			state.leader_task.cancel()
+			await teardown("leader task", lambda: state.leader_task)
+		await teardown("twitter monitor", state.twitter_monitor.close)
+		await teardown("telegram delivery", state.delivery.stop)
+		updater = state.telegram_bot.updater
+		if updater and updater.running:
+			await teardown("telegram updater", updater.stop)
+		if state.telegram_bot.running:
+			await teardown("telegram bot", state.telegram_bot.stop)
+		await teardown("telegram shutdown", state.telegram_bot.shutdown)
+		await teardown("database", state.db_engine.dispose)
+		await teardown("leader lock", state.leader_lock.release)
+
+
+def create_app(app_config: Config) -> FastAPI:
+	"""Create and configure the application, async setup happens in the lifespan"""
 	fastapi_app = FastAPI(lifespan=lifespan)
 	
 	try:
-		# Setup database
-		engine = create_engine(app_config.DATABASE_URL)
-		Base.metadata.create_all(engine)
-		Session = sessionmaker(bind=engine)
-		session = Session()
+		# Setup database with an async engine and per-unit-of-work sessions
+		engine, session_factory = create_session_factory(app_config.DATABASE_URL)
 		
-		# Initialize the telegram bot application with polling
-		telegram_app = (
+		# Initialize the telegram bot application, without an updater in webhook mode
+		builder = (
 			ApplicationBuilder()
 			.token(app_config.TELEGRAM_TOKEN)
-			.build()
+			.concurrent_updates(app_config.TELEGRAM_CONCURRENT_UPDATES)
 		)
+		if app_config.TELEGRAM_WEBHOOK_URL:
+			builder = builder.updater(None)
+		telegram_app = builder.build()
 		
 		# Initialize queries
-		user_queries = UserQueries(session, config=app_config)
-		account_queries = AccountQueries(session)
+		user_queries = UserQueries(session_factory, config=app_config)
+		account_queries = AccountQueries(session_factory)
 		
+		# Outbound Telegram delivery queue shared by every sender
+		delivery = TelegramDelivery(
+			telegram_app,
+			workers=app_config.TELEGRAM_SEND_WORKERS,
+			global_rate=app_config.TELEGRAM_GLOBAL_RATE,
+			chat_rate=app_config.TELEGRAM_CHAT_RATE
+		)
+
 		#initialize Twitter API
 		twitter_api = TwitterManager(
 			config=app_config,
 			account_queries=account_queries,
 			telegram_bot=telegram_app,
-			user_queries=user_queries
+			user_queries=user_queries,
+			delivery=delivery
 		)
+		# Becomes the leader once it holds the lock
+		twitter_api.is_leader = False
+		# Role changes made on any worker reach the leader's recipient cache
+		user_queries.relay = twitter_api.relay
+	
+		# Account Activity webhook receiver for push delivery
+		if app_config.TWITTER_WEBHOOK_SECRET:
+			twitter_webhook = TwitterWebhook(
+				manager=twitter_api,
+				account_queries=account_queries,
+				consumer_secret=app_config.TWITTER_WEBHOOK_SECRET,
+				webhook_id=app_config.TWITTER_WEBHOOK_ID
+			)
+			fastapi_app.include_router(twitter_webhook.router())
 	
+		# Telegram webhook endpoint replacing long polling
+		if app_config.TELEGRAM_WEBHOOK_URL:
+			telegram_webhook = TelegramWebhook(
+				telegram_app,
+				url=app_config.TELEGRAM_WEBHOOK_URL,
+				secret_token=app_config.TELEGRAM_WEBHOOK_SECRET
+			)
+			fastapi_app.include_router(telegram_webhook.router())
+			fastapi_app.state.telegram_webhook = telegram_webhook
+
+		# Prometheus scrape target and monitor liveness probe
+		metrics.TELEGRAM_QUEUE_DEPTH.set_function(lambda: delivery.pending)
+
+		@fastapi_app.get("/metrics")
+		async def metrics_endpoint():
+			return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+		@fastapi_app.get("/health")
+		async def health():
+			status = twitter_api.health()
+			return Response(
+				json.dumps(status),
+				status_code=200 if status["status"] == "ok" else 503,
+				media_type="application/json"
+			)
+
 		# Initialize bot components
 		commands = Commands(telegram_app, user_queries, account_queries, twitter_api)
 		handlers = BotHandlers(commands)
@@ -111,8 +228,13 @@ async def create_app(app_config: Config):
 		handlers.register_handlers(telegram_app)
 		
 		# Store telegram bot in-app state
+		fastapi_app.state.config = app_config
 		fastapi_app.state.telegram_bot = telegram_app
 		fastapi_app.state.twitter_monitor = twitter_api
+		fastapi_app.state.user_queries = user_queries
+		fastapi_app.state.db_engine = engine
+		fastapi_app.state.delivery = delivery
+		fastapi_app.state.leader_lock = LeaderLock(app_config.LEADER_LOCK_FILE)
 		
 		return fastapi_app
 	
@@ -120,18 +242,24 @@ async def create_app(app_config: Config):
 		logger.error(f"Error creating application: {str(exception)}")
 		raise
 
+
+def app_factory() -> FastAPI:
+	"""Application factory used by uvicorn in every worker process"""
+	return create_app(Config.load_config())
+
+
 def run_app():
 	try:
 		config = Config.load_config()
 		logger.info("Configuration loaded successfully")
 		
-		app = asyncio.run(create_app(config))
-		
-		logger.info("Starting application...")
+		logger.info(f"Starting application with {config.WEB_WORKERS} worker(s)...")
 		uvicorn.run(
-			app,
+			"main:app_factory",
+			factory=True,
 			host="0.0.0.0",
 			port=8000,
+			workers=config.WEB_WORKERS,
 			log_level="info"
 		)
 	except Exception as e:
@@ -0,0 +1,315 @@
+# metrics.py
+import time
+import bisect
+from collections import deque
+
+# Latency buckets in seconds shared by every histogram unless overridden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Source label of this process's gauge values once shard snapshots are merged in
+LOCAL_SOURCE = "main"
+
+
+def _escape(value) -> str:
+	return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+	pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+	if extra:
+		pairs.append(extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+	"""Monotonic counter, label values are passed positionally to keep inc() cheap"""
+
+	kind = "counter"
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = labelnames
+		self.values = {}
+
+	def inc(self, *labels, amount: float = 1):
+		self.values[labels] = self.values.get(labels, 0) + amount
+
+	def get(self, *labels) -> float:
+		return self.values.get(labels, 0)
+
+	def total(self) -> float:
+		return sum(self.values.values())
+
+	def samples(self):
+		for labels, value in self.values.items():
+			yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+	def snapshot(self) -> dict:
+		"""Picklable copy of the current values, sent from shard processes"""
+		return dict(self.values)
+
+	def merged(self, snapshots: dict) -> 'Counter':
+		"""New metric holding these values summed with other processes' snapshots, keyed by source"""
+		metric = Counter(self.name, self.documentation, self.labelnames)
+		metric.values = self.snapshot()
+		for snapshot in snapshots.values():
+			for labels, value in snapshot.items():
+				metric.values[labels] = metric.values.get(labels, 0) + value
+		return metric
+
+
+class Gauge(Counter):
+	"""Value that can go up and down, or be read from a callback at scrape time"""
+
+	kind = "gauge"
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+		super().__init__(name, documentation, labelnames)
+		self.function = None
+
+	def set(self, value: float, *labels):
+		self.values[labels] = value
+
+	def set_function(self, function):
+		"""Read the unlabelled value from function() whenever metrics are rendered"""
+		self.function = function
+
+	def refresh(self):
+		if self.function:
+			try:
+				self.values[()] = self.function()
+			except Exception:
+				pass
+
+	def samples(self):
+		self.refresh()
+		yield from super().samples()
+
+	def snapshot(self) -> dict:
+		self.refresh()
+		return super().snapshot()
+
+	def merged(self, snapshots: dict) -> 'Gauge':
+		"""
+		New gauge with every process's values under a source label. Levels like
+		queue depth or a shared token's remaining quota do not add up across processes.
+		"""
+		metric = Gauge(self.name, self.documentation, self.labelnames + ("source",))
+		for source, snapshot in {LOCAL_SOURCE: self.snapshot(), **snapshots}.items():
+			for labels, value in snapshot.items():
+				metric.values[labels + (source,)] = value
+		return metric
+
+
+class Histogram:
+	"""
+	Bucketed histogram for Prometheus plus a rolling window of recent
+	observations for in-process percentiles.
+	"""
+
+	kind = "histogram"
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+				 buckets: tuple = DEFAULT_BUCKETS, window: int = 1000):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = labelnames
+		self.buckets = tuple(buckets)
+		self.window = window
+		self.series = {}
+
+	def _series(self, labels: tuple) -> dict:
+		series = self.series.get(labels)
+		if series is None:
+			series = self.series[labels] = {
+				'counts': [0] * (len(self.buckets) + 1),
+				'sum': 0.0,
+				'count': 0,
+				'recent': deque(maxlen=self.window)
+			}
+		return series
+
+	def observe(self, value: float, *labels):
+		series = self._series(labels)
+		series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+		series['sum'] += value
+		series['count'] += 1
+		series['recent'].append(value)
+
+	def time(self, *labels) -> 'Timer':
+		"""Context manager observing the elapsed time of its block"""
+		return Timer(self, labels)
+
+	def last(self, *labels) -> float | None:
+		series = self.series.get(labels)
+		if not series or not series['recent']:
+			return None
+		return series['recent'][-1]
+
+	def percentile(self, quantile: float, *labels) -> float | None:
+		"""Percentile over the rolling window, across all label sets when none are given"""
+		if labels:
+			series = self.series.get(labels)
+			values = list(series['recent']) if series else []
+		else:
+			values = [value for series in self.series.values() for value in series['recent']]
+		if not values:
+			return None
+		values.sort()
+		return values[min(int(quantile * len(values)), len(values) - 1)]
+
+	def snapshot(self) -> dict:
+		"""Picklable copy of every series, sent from shard processes"""
+		return {
+			labels: {
+				'counts': list(series['counts']),
+				'sum': series['sum'],
+				'count': series['count'],
+				'recent': list(series['recent'])
+			}
+			for labels, series in self.series.items()
+		}
+
+	def merged(self, snapshots: dict) -> 'Histogram':
+		"""New histogram combining this one with other processes' snapshots, keyed by source"""
+		metric = Histogram(
+			self.name, self.documentation, self.labelnames,
+			buckets=self.buckets, window=self.window * (len(snapshots) + 1)
+		)
+		for snapshot in [self.snapshot(), *snapshots.values()]:
+			for labels, other in snapshot.items():
+				series = metric._series(labels)
+				series['counts'] = [a + b for a, b in zip(series['counts'], other['counts'])]
+				series['sum'] += other['sum']
+				series['count'] += other['count']
+				series['recent'].extend(other['recent'])
+		return metric
+
+	def samples(self):
+		for labels, series in self.series.items():
+			cumulative = 0
+			for bound, count in zip(self.buckets, series['counts']):
+				cumulative += count
+				bucket = _labels(self.labelnames, labels, 'le="%s"' % bound)
+				yield f"{self.name}_bucket{bucket} {cumulative}"
+			bucket = _labels(self.labelnames, labels, 'le="+Inf"')
+			yield f"{self.name}_bucket{bucket} {series['count']}"
+			yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series['sum']}"
+			yield f"{self.name}_count{_labels(self.labelnames, labels)} {series['count']}"
+
+
+class Timer:
+	__slots__ = ('histogram', 'labels', 'started')
+
+	def __init__(self, histogram: Histogram, labels: tuple):
+		self.histogram = histogram
+		self.labels = labels
+
+	def __enter__(self):
+		self.started = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+		return False
+
+
+class Registry:
+	"""
+	Collection of metrics rendered in the Prometheus text exposition format.
+	Snapshots reported by shard processes are summed into what it renders.
+	"""
+
+	def __init__(self):
+		self.metrics = {}
+		# Latest snapshot per reporting process, source -> {name: snapshot}
+		self.remote = {}
+
+	def register(self, metric):
+		self.metrics[metric.name] = metric
+		return metric
+
+	def snapshot(self) -> dict:
+		return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+	def update_remote(self, source, snapshot: dict):
+		self.remote[source] = snapshot
+
+	def clear_remote(self):
+		self.remote = {}
+
+	def combined(self, metric):
+		"""The metric summed across this process and every reporting process"""
+		if not self.remote:
+			return metric
+		return metric.merged({
+			source: snapshot[metric.name]
+			for source, snapshot in self.remote.items() if metric.name in snapshot
+		})
+
+	def render(self) -> str:
+		lines = []
+		for metric in map(self.combined, self.metrics.values()):
+			lines.append(f"# HELP {metric.name} {metric.documentation}")
+			lines.append(f"# TYPE {metric.name} {metric.kind}")
+			lines.extend(metric.samples())
+		return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Twitter API
+TWITTER_REQUESTS = REGISTRY.register(Counter(
+	"twitter_requests_total", "Twitter API responses by endpoint and status", ("endpoint", "status")
+))
+TWITTER_REQUEST_SECONDS = REGISTRY.register(Histogram(
+	"twitter_request_seconds", "Twitter API request latency", ("endpoint",)
+))
+TWITTER_RATE_LIMIT_REMAINING = REGISTRY.register(Gauge(
+	"twitter_rate_limit_remaining", "Requests left in the current window per token", ("token", "endpoint")
+))
+TWITTER_COALESCED_REQUESTS = REGISTRY.register(Counter(
+	"twitter_coalesced_requests_total", "Requests served by an identical in-flight request"
+))
+USERNAME_CACHE_LOOKUPS = REGISTRY.register(Counter(
+	"username_cache_lookups_total", "Username resolutions served from stored accounts, the cache or the API", ("result",)
+))
+
+# Monitor
+MONITOR_CYCLE_SECONDS = REGISTRY.register(Histogram(
+	"monitor_cycle_seconds", "Duration of one monitor loop iteration",
+	buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+))
+MONITOR_ERRORS = REGISTRY.register(Counter(
+	"monitor_errors_total", "Errors in the monitor by stage", ("stage",)
+))
+ACCOUNT_FETCH_SECONDS = REGISTRY.register(Histogram(
+	"account_fetch_seconds", "Time to poll one account or search batch", ("mode",)
+))
+DETECTION_LATENCY_SECONDS = REGISTRY.register(Histogram(
+	"detection_latency_seconds", "Delay between a tweet's creation and its detection",
+	buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+))
+TWEETS_DELIVERED = REGISTRY.register(Counter(
+	"tweets_delivered_total", "Tweets handed to Telegram delivery"
+))
+DUPLICATE_TWEETS = REGISTRY.register(Counter(
+	"duplicate_tweets_total", "Tweets dropped because they were already delivered"
+))
+
+# Telegram
+TELEGRAM_SEND_SECONDS = REGISTRY.register(Histogram(
+	"telegram_send_seconds", "Latency of Telegram sendMessage calls"
+))
+TELEGRAM_MESSAGES = REGISTRY.register(Counter(
+	"telegram_messages_total", "Telegram send outcomes", ("status",)
+))
+TELEGRAM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+	"telegram_queue_depth", "Messages waiting in the outbound Telegram queue"
+))
+
+# Database
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+	"db_query_seconds", "Database statement latency by statement type", ("statement",)
+))
@@ -0,0 +1,175 @@
+"""
+Local fake of the Twitter API v2 endpoints the monitor uses.
+
+Point TWITTER_API_BASE_URL at http://127.0.0.1:8100/2 and any bearer token
+works. Every monitored author posts a tweet every --interval seconds. The
+filtered stream drops its connection after --drop-after tweets, which
+exercises the reconnect and since_id replay path. Tweets posted while no
+client is connected are still served by users/:id/tweets and recent search.
+
+Usage: python tools/fake_twitter.py [--port 8100] [--interval 2] [--drop-after 10]
+"""
+import re
+import time
+import json
+import asyncio
+import argparse
+import datetime
+import itertools
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+SNOWFLAKE_EPOCH_MS = 1288834974657
+RATE_LIMIT_HEADERS = {
+    "x-rate-limit-limit": "1500",
+    "x-rate-limit-remaining": "1499",
+}
+
+app = FastAPI()
+state = {
+    "rules": {},        # rule id -> {"id", "value", "tag"}
+    "tweets": [],       # newest last
+    "connected": 0,
+    "interval": 2.0,
+    "drop_after": 10,
+}
+rule_ids = itertools.count(1)
+sequence = itertools.count()
+
+
+def rate_limit_headers() -> dict:
+    reset = int(time.time()) + 900
+    return {**RATE_LIMIT_HEADERS, "x-rate-limit-reset": str(reset)}
+
+
+def new_snowflake() -> int:
+    milliseconds = int(time.time() * 1000) - SNOWFLAKE_EPOCH_MS
+    return (milliseconds << 22) | (next(sequence) & 0x3FFFFF)
+
+
+def authors() -> set:
+    """Author IDs named in the current stream rules (from:<id>)"""
+    found = set()
+    for rule in state["rules"].values():
+        found.update(re.findall(r'from:(\d+)', rule["value"]))
+    return found
+
+
+def tweets_for(author_ids: set, since_id: int = 0, limit: int = 100) -> list:
+    matching = [
+        tweet for tweet in reversed(state["tweets"])
+        if tweet["author_id"] in author_ids and int(tweet["id"]) > since_id
+    ]
+    return matching[:limit]
+
+
+def page(tweets: list) -> dict:
+    if not tweets:
+        return {"meta": {"result_count": 0}}
+    return {
+        "data": tweets,
+        "meta": {"result_count": len(tweets), "newest_id": tweets[0]["id"], "oldest_id": tweets[-1]["id"]}
+    }
+
+
+async def post_tweets():
+    """Every author in the rules posts one tweet per interval"""
+    while True:
+        await asyncio.sleep(state["interval"])
+        for author_id in sorted(authors()):
+            tweet_id = new_snowflake()
+            state["tweets"].append({
+                "id": str(tweet_id),
+                "text": f"Fake tweet {tweet_id} from {author_id}",
+                "author_id": author_id,
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat().replace('+00:00', 'Z'),
+            })
+        del state["tweets"][:-10000]
+
+
+@app.on_event("startup")
+async def start_posting():
+    asyncio.create_task(post_tweets())
+
+
+@app.get("/2/users/by")
+async def users_by(usernames: str):
+    data = [
+        {"id": str(1000 + sum(ord(char) for char in name.lower())), "username": name}
+        for name in usernames.split(",") if name
+    ]
+    return {"data": data}
+
+
+@app.get("/2/users/{user_id}/tweets")
+async def user_tweets(user_id: str, max_results: int = 10, since_id: int = 0):
+    return page(tweets_for({user_id}, since_id, max_results))
+
+
+@app.get("/2/tweets/search/recent")
+async def search_recent(query: str, max_results: int = 10, since_id: int = 0):
+    return page(tweets_for(set(re.findall(r'from:(\d+)', query)), since_id, max_results))
+
+
+@app.get("/2/tweets/search/stream/rules")
+async def get_rules():
+    return {"data": list(state["rules"].values()), "meta": {"result_count": len(state["rules"])}}
+
+
+@app.post("/2/tweets/search/stream/rules")
+async def update_rules(request: Request):
+    body = await request.json()
+    for rule_id in body.get("delete", {}).get("ids", []):
+        state["rules"].pop(str(rule_id), None)
+    for rule in body.get("add", []):
+        rule_id = str(next(rule_ids))
+        state["rules"][rule_id] = {"id": rule_id, "value": rule["value"], "tag": rule.get("tag")}
+    return {"meta": {"summary": {"valid": len(state["rules"])}}}
+
+
+@app.get("/2/tweets/search/stream")
+async def stream():
+    async def lines():
+        state["connected"] += 1
+        last_id = int(state["tweets"][-1]["id"]) if state["tweets"] else 0
+        sent = 0
+        try:
+            while sent < state["drop_after"]:
+                await asyncio.sleep(0.5)
+                fresh = [tweet for tweet in state["tweets"] if int(tweet["id"]) > last_id]
+                if not fresh:
+                    yield "\r\n"  # keep-alive
+                    continue
+                for tweet in fresh:
+                    last_id = int(tweet["id"])
+                    if tweet["author_id"] in authors():
+                        yield json.dumps({"data": tweet}) + "\r\n"
+                        sent += 1
+        finally:
+            state["connected"] -= 1
+
+    return StreamingResponse(lines(), media_type="application/json", headers=rate_limit_headers())
+
+
+@app.middleware("http")
+async def add_rate_limit_headers(request: Request, call_next):
+    response = await call_next(request)
+    for header, value in rate_limit_headers().items():
+        response.headers.setdefault(header, value)
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between tweets per author")
+    parser.add_argument("--drop-after", type=int, default=10, help="streamed tweets per connection")
+    args = parser.parse_args()
+    state["interval"] = args.interval
+    state["drop_after"] = args.drop_after
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()